@@ -0,0 +1,138 @@
+"""
+Admission Control
+Bounds how many requests may wait on Fintoc at once, per worker and globally
+"""
+import fcntl
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _GlobalSlots:
+    """Cross-process slots backed by flock'ed files; the OS frees them if a worker dies"""
+
+    def __init__(self, directory: str, count: int):
+        os.makedirs(directory, exist_ok=True)
+        self.paths = [os.path.join(directory, f"slot-{i}.lock") for i in range(count)]
+
+    def try_acquire(self):
+        """Return a locked file descriptor, or None if every slot is taken"""
+        start = random.randrange(len(self.paths))
+        for path in self.paths[start:] + self.paths[:start]:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        slots_dir: str,
+        per_worker: int = 8,
+        global_limit: int = 32,
+        max_queue: int = 16,
+        max_wait: float = 2.0,
+        class_limits: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            slots_dir: Directory for the global slot lock files
+            per_worker: Concurrent admitted requests in this process
+            global_limit: Concurrent admitted requests across all workers
+            max_queue: Requests allowed to wait for a slot in this process
+            max_wait: Seconds a request may wait before being rejected
+            class_limits: Concurrent requests of a route class in this
+                process, on top of ``per_worker`` (e.g. long exports)
+        """
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._local = threading.BoundedSemaphore(per_worker)
+        self._classes = {
+            route_class: threading.BoundedSemaphore(limit)
+            for route_class, limit in (class_limits or {}).items()
+        }
+        self._global = _GlobalSlots(slots_dir, global_limit)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    def acquire(self, route_class: str):
+        """
+        Pedir un cupo para una ruta que llama a Fintoc
+
+        Args:
+            route_class: Tag used in metrics and logs
+
+        Returns:
+            A release callable, or None if the request must be rejected
+        """
+        started = time.monotonic()
+
+        # Las clases con límite propio no esperan: sus requests son largos
+        class_slots = self._classes.get(route_class)
+        if class_slots and not class_slots.acquire(blocking=False):
+            return self._reject(route_class, "route class limit reached")
+
+        fd = self._acquire_slots(route_class, started + self.max_wait)
+        if fd is None:
+            if class_slots:
+                class_slots.release()
+            return None
+
+        metrics.increment(f"admission.admitted.{route_class}")
+        metrics.observe(f"admission.wait.{route_class}", time.monotonic() - started)
+
+        once = threading.Lock()
+
+        def release():
+            # Safe to call more than once; only the first call frees the slots
+            if once.acquire(blocking=False):
+                self._global.release(fd)
+                self._local.release()
+                if class_slots:
+                    class_slots.release()
+
+        return release
+
+    def _acquire_slots(self, route_class: str, deadline: float):
+        """Take a worker and a global slot, returning the global slot's fd or None"""
+        if not self._local.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    return self._reject(route_class, "queue full")
+                self._waiting += 1
+            try:
+                admitted = self._local.acquire(timeout=max(0, deadline - time.monotonic()))
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not admitted:
+                return self._reject(route_class, "worker saturated")
+
+        fd = self._global.try_acquire()
+        while fd is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+            fd = self._global.try_acquire()
+        if fd is None:
+            self._local.release()
+            return self._reject(route_class, "global limit reached")
+        return fd
+
+    def _reject(self, route_class: str, reason: str):
+        metrics.increment(f"admission.rejected.{route_class}")
+        logger.warning(f"Rejected {route_class} request: {reason}")
+        return None
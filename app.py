@@ -1,12 +1,15 @@
 from flask import (
     Flask,
     render_template,
+    stream_template,
+    get_flashed_messages,
     request,
     jsonify,
     session,
     redirect,
     url_for,
     flash,
+    make_response,
 )
 from flask_login import (
     LoginManager,
@@ -16,11 +19,20 @@ from flask_login import (
     login_required,
     current_user,
 )
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-from google_auth_oauthlib.flow import Flow
+from admission import AdmissionController
 from fintoc_service import FintocService
+from metrics import metrics
+from movement_export import iter_csv, iter_parquet, parquet_available, resume_after
+from profiler import init_profiler, sign_profile_token
+from rate_limiter import TokenBucketLimiter
+from template_cache import init_template_cache
+from tracing import init_tracing
+import click
 import os
+import re
+from functools import wraps
+import subprocess
+import sys
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
@@ -32,6 +44,90 @@ app.config["FINTOC_PUBLIC_KEY"] = os.environ.get("FINTOC_PUBLIC_KEY")
 app.config["FINTOC_BASE_URL"] = os.environ.get(
     "FINTOC_BASE_URL", "https://api.fintoc.com/v1"
 )
+# Stream the dashboard so account cards flush before movements arrive
+app.config["FINTOC_STREAM_DASHBOARD"] = (
+    os.environ.get("FINTOC_STREAM_DASHBOARD", "true").lower() == "true"
+)
+
+# Seconds the data prefetched after connecting a bank stays warm (0 disables)
+app.config["FINTOC_PREFETCH_SECONDS"] = float(
+    os.environ.get("FINTOC_PREFETCH_SECONDS", 60)
+)
+
+# Template caching (bytecode survives restarts, fragments are kept in memory)
+app.config["JINJA_BYTECODE_CACHE_DIR"] = os.environ.get("JINJA_BYTECODE_CACHE_DIR")
+app.config["FRAGMENT_CACHE_SIZE"] = int(os.environ.get("FRAGMENT_CACHE_SIZE", 512))
+init_template_cache(app)
+
+# Local movement index (defaults to instance/movements.db)
+app.config["MOVEMENT_DB_PATH"] = os.environ.get("MOVEMENT_DB_PATH")
+# Days of history indexed when a bank is connected (0 = full history)
+app.config["MOVEMENT_SYNC_DAYS"] = int(os.environ.get("MOVEMENT_SYNC_DAYS", 365))
+
+# Balance history time series (defaults to instance/balances.db)
+app.config["BALANCE_DB_PATH"] = os.environ.get("BALANCE_DB_PATH")
+
+# Per-user rate limits on upstream-bound API routes (shared by all workers)
+app.config["RATE_LIMIT_DB_PATH"] = os.environ.get("RATE_LIMIT_DB_PATH")
+app.config["FINTOC_RATE_LIMIT_PER_MINUTE"] = float(
+    os.environ.get("FINTOC_RATE_LIMIT_PER_MINUTE", 30)
+)
+app.config["FINTOC_RATE_LIMIT_BURST"] = int(os.environ.get("FINTOC_RATE_LIMIT_BURST", 10))
+if app.config["FINTOC_RATE_LIMIT_PER_MINUTE"] <= 0:
+    raise ValueError("FINTOC_RATE_LIMIT_PER_MINUTE must be positive")
+if app.config["FINTOC_RATE_LIMIT_BURST"] < 1:
+    raise ValueError("FINTOC_RATE_LIMIT_BURST must be at least 1")
+
+# Admission control for routes that wait on Fintoc, so a slow upstream
+# cannot tie up every worker thread
+app.config["UPSTREAM_MAX_CONCURRENCY_PER_WORKER"] = int(
+    os.environ.get("UPSTREAM_MAX_CONCURRENCY_PER_WORKER", 8)
+)
+app.config["UPSTREAM_MAX_CONCURRENCY_GLOBAL"] = int(
+    os.environ.get("UPSTREAM_MAX_CONCURRENCY_GLOBAL", 32)
+)
+app.config["UPSTREAM_MAX_QUEUE"] = int(os.environ.get("UPSTREAM_MAX_QUEUE", 16))
+app.config["UPSTREAM_MAX_QUEUE_SECONDS"] = float(
+    os.environ.get("UPSTREAM_MAX_QUEUE_SECONDS", 2)
+)
+app.config["ADMISSION_SLOTS_DIR"] = os.environ.get("ADMISSION_SLOTS_DIR")
+# Exports hold their slot for the whole download, so they get their own cap
+app.config["UPSTREAM_MAX_EXPORTS_PER_WORKER"] = int(
+    os.environ.get("UPSTREAM_MAX_EXPORTS_PER_WORKER", 2)
+)
+# Threads per worker for parallel Fintoc calls (default: 4 per admitted request)
+app.config["FINTOC_POOL_SIZE"] = int(
+    os.environ.get("FINTOC_POOL_SIZE")
+    or 4 * app.config["UPSTREAM_MAX_CONCURRENCY_PER_WORKER"]
+)
+
+# Request tracing (OTLP/JSON lines, defaults to instance/traces.jsonl)
+app.config["TRACING_ENABLED"] = (
+    os.environ.get("TRACING_ENABLED", "true").lower() == "true"
+)
+app.config["TRACE_FILE"] = os.environ.get("TRACE_FILE")
+app.config["TRACE_FILE_MAX_BYTES"] = int(
+    os.environ.get("TRACE_FILE_MAX_BYTES", 10 * 1024 * 1024)
+)
+init_tracing(app)
+
+# On-demand profiler (off by default; no overhead unless enabled)
+app.config["PROFILER_ENABLED"] = (
+    os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+)
+app.config["PROFILER_DIR"] = os.environ.get("PROFILER_DIR")
+app.config["PROFILER_SECRET"] = os.environ.get("PROFILER_SECRET")
+app.config["PROFILER_ADMIN_EMAILS"] = [
+    email.strip()
+    for email in os.environ.get("PROFILER_ADMIN_EMAILS", "").split(",")
+    if email.strip()
+]
+app.config["PROFILER_SAMPLE_RATE"] = float(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+app.config["PROFILER_INTERVAL"] = float(os.environ.get("PROFILER_INTERVAL", 0.005))
+app.config["PROFILER_CONTINUOUS_INTERVAL"] = float(
+    os.environ.get("PROFILER_CONTINUOUS_INTERVAL", 0.1)
+)
+init_profiler(app)
 
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "your-google-client-id")
@@ -73,6 +169,188 @@ def get_fintoc_service():
     return fintoc_service
 
 
+# Movimientos por página en el detalle de cuenta
+MOVEMENTS_PAGE_SIZE = 50
+
+# Movimientos recientes por cuenta en el dashboard
+RECENT_MOVEMENTS_LIMIT = 10
+
+
+def recent_movements_since():
+    """Start date (YYYY-MM-DD) of the dashboard's recent movements"""
+    return (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def movement_sync_since(days):
+    """Start date (YYYY-MM-DD) of an index sync, None for the full history"""
+    if not days:
+        return None
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+# Rate limiter - initialized on first use
+rate_limiter = None
+
+
+def get_rate_limiter():
+    """Get or create the shared token bucket limiter"""
+    global rate_limiter
+    if rate_limiter is None:
+        rate_limiter = TokenBucketLimiter(
+            app.config["RATE_LIMIT_DB_PATH"]
+            or os.path.join(app.instance_path, "rate_limits.db"),
+            rate_per_minute=app.config["FINTOC_RATE_LIMIT_PER_MINUTE"],
+            burst=app.config["FINTOC_RATE_LIMIT_BURST"],
+        )
+    return rate_limiter
+
+
+def rate_limited(view):
+    """Throttle a route per user with a token bucket, answering 429 when empty"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        endpoint = request.endpoint
+        allowed, retry_after = get_rate_limiter().acquire(
+            f"{current_user.get_id()}:{endpoint}"
+        )
+        if not allowed:
+            metrics.increment(f"rate_limit.throttled.{endpoint}")
+            app.logger.warning(
+                f"Rate limited {endpoint} for user {current_user.get_id()}"
+            )
+            response = jsonify(
+                {"status": "error", "error": "Too many requests, try again later"}
+            )
+            response.status_code = 429
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+
+        metrics.increment(f"rate_limit.allowed.{endpoint}")
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+# Admission controller - initialized on first use
+admission_controller = None
+
+
+def get_admission_controller():
+    """Get or create the admission controller for Fintoc-bound routes"""
+    global admission_controller
+    if admission_controller is None:
+        admission_controller = AdmissionController(
+            app.config["ADMISSION_SLOTS_DIR"]
+            or os.path.join(app.instance_path, "admission_slots"),
+            per_worker=app.config["UPSTREAM_MAX_CONCURRENCY_PER_WORKER"],
+            global_limit=app.config["UPSTREAM_MAX_CONCURRENCY_GLOBAL"],
+            max_queue=app.config["UPSTREAM_MAX_QUEUE"],
+            max_wait=app.config["UPSTREAM_MAX_QUEUE_SECONDS"],
+            class_limits={
+                "fintoc_export": app.config["UPSTREAM_MAX_EXPORTS_PER_WORKER"]
+            },
+        )
+    return admission_controller
+
+
+def admitted(route_class):
+    """Hold an admission slot while the route runs, answering 503 when saturated"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            release = get_admission_controller().acquire(route_class)
+            if release is None:
+                return service_busy()
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                release()
+                raise
+
+            if response.is_streamed:
+                # Streamed bodies keep calling Fintoc after the view returns
+                response.call_on_close(release)
+            else:
+                release()
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def service_busy():
+    """503 response for requests shed by admission control"""
+    if request.path.startswith("/api/") or request.is_json:
+        response = jsonify(
+            {"status": "error", "error": "Service busy, try again shortly"}
+        )
+    else:
+        response = make_response(render_template("503.html", title="Service Busy"))
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+def get_session_links():
+    """
+    Links bancarios conectados por el usuario
+
+    Returns:
+        List of {"link_token": ..., "link": ...} entries stored in the session
+    """
+    if "fintoc_links" not in session:
+        links = []
+        # Sesiones anteriores guardaban un único link
+        legacy_token = session.pop("fintoc_link_token", None)
+        legacy_data = session.pop("fintoc_link_data", None)
+        if legacy_token:
+            links.append(
+                {"link_token": legacy_token, "link": summarize_link(legacy_data or {})}
+            )
+        session["fintoc_links"] = links
+    return session["fintoc_links"]
+
+
+def summarize_link(link):
+    """Keep only the link fields the templates use, so the session cookie stays small"""
+    return {key: link[key] for key in ("id", "status", "institution") if key in link}
+
+
+def link_token_for_account(account_id):
+    """
+    Find the link token that owns ``account_id``
+
+    Accounts already shown on the dashboard are looked up in the session;
+    otherwise the accounts of every connected link are fetched.
+
+    Returns:
+        The owning link token, or None if no connected link has the account
+    """
+    links = get_session_links()
+    account_links = session.get("fintoc_account_links", {})
+    if account_id not in account_links and links:
+        accounts_by_link = get_fintoc_service().get_links_accounts(
+            [entry["link_token"] for entry in links]
+        )
+        for entry, accounts in zip(links, accounts_by_link):
+            for account in accounts:
+                if account.get("id"):
+                    account_links[account["id"]] = (
+                        entry["link"].get("id") or entry["link_token"]
+                    )
+        session["fintoc_account_links"] = account_links
+
+    link_id = account_links.get(account_id)
+    for entry in links:
+        if link_id and (entry["link"].get("id") or entry["link_token"]) == link_id:
+            return entry["link_token"]
+    return None
+
+
 @login_manager.user_loader
 def load_user(user_id):
     return users.get(user_id)
@@ -96,10 +374,10 @@ def login():
     return render_template("login.html", title="Iniciar Sesión")
 
 
-@app.route("/google-login")
-def google_login():
-    """Iniciar proceso de OAuth con Google"""
-    # Create flow instance for Google OAuth
+def build_google_flow():
+    """Create the Google OAuth flow, importing the OAuth SDK on first use"""
+    from google_auth_oauthlib.flow import Flow
+
     flow = Flow.from_client_config(
         {
             "web": {
@@ -117,6 +395,14 @@ def google_login():
         ],
     )
     flow.redirect_uri = url_for("callback", _external=True)
+    return flow
+
+
+@app.route("/google-login")
+def google_login():
+    """Iniciar proceso de OAuth con Google"""
+    # Create flow instance for Google OAuth
+    flow = build_google_flow()
 
     authorization_url, state = flow.authorization_url(
         access_type="offline",
@@ -135,28 +421,15 @@ def callback():
         return "Invalid state parameter", 400
 
     # Create flow instance
-    flow = Flow.from_client_config(
-        {
-            "web": {
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": ["http://localhost:5001/callback"],
-            }
-        },
-        scopes=[
-            "openid",
-            "https://www.googleapis.com/auth/userinfo.email",
-            "https://www.googleapis.com/auth/userinfo.profile",
-        ],
-    )
-    flow.redirect_uri = url_for("callback", _external=True)
+    flow = build_google_flow()
 
     # Fetch token
     flow.fetch_token(authorization_response=request.url)
 
     # Get user info from Google
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+
     credentials = flow.credentials
     request_session = google_requests.Request()
 
@@ -210,6 +483,7 @@ def api_data():
 # Fintoc Integration Routes
 @app.route("/fintoc")
 @login_required
+@admitted("fintoc_page")
 def fintoc_dashboard():
     """Fintoc dashboard showing connected accounts and financial data"""
     service = get_fintoc_service()
@@ -229,69 +503,70 @@ def fintoc_dashboard():
     # Get user's connected links from session
     links = []
     financial_data = []
+    stream = app.config["FINTOC_STREAM_DASHBOARD"]
+    movement_updates = None
+    timeline = None
 
-    # Verificar si hay un link token en la sesión
-    if "fintoc_link_token" in session and session["fintoc_link_token"]:
+    session_links = get_session_links()
+    if session_links:
         try:
-            link_token = session["fintoc_link_token"]
-            link_data = session.get("fintoc_link_data", {})
-
-            app.logger.info(f"Found link token in session: {link_token}")
-
-            # Obtener información del link usando datos de sesión
-            link_info = link_data or {"id": link_token, "status": "connected"}
-            links.append(link_info)
-
-            # Obtener cuentas del link
-            app.logger.info(f"Attempting to get accounts for link: {link_token}")
-            accounts = service.get_link_accounts(link_token)
-            app.logger.info(f"Retrieved {len(accounts) if accounts else 0} accounts")
-            
-            if accounts:
-                # Para cada cuenta, obtener también movimientos recientes
+            link_tokens = [entry["link_token"] for entry in session_links]
+            app.logger.info(f"Found {len(link_tokens)} links in session")
+
+            # Cuentas de todos los links en paralelo
+            accounts_by_link = service.get_links_accounts(link_tokens)
+
+            account_links = {}
+            pending = []
+            for entry, accounts in zip(session_links, accounts_by_link):
+                link_token = entry["link_token"]
+                link_info = entry["link"] or {"id": link_token, "status": "connected"}
+                links.append(link_info)
+
+                if not accounts:
+                    app.logger.warning(f"No accounts found for link {link_token}")
+                    # Intentar re-obtener el link para debugging
+                    app.logger.info(f"Attempting to verify link {link_token} exists...")
+                    try:
+                        verify_response = service.verify_link(link_token)
+                        app.logger.info(f"Link verification result: {verify_response}")
+                    except Exception as e:
+                        app.logger.error(f"Error verifying link: {str(e)}")
+                    continue
+
                 for account in accounts:
-                    account_id = account.get('id')
-                    if account_id:
-                        app.logger.info(f"Getting recent movements for account {account_id}")
-                        # Obtener movimientos de los últimos 30 días
-                        from datetime import datetime, timedelta
-                        since_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-                        movements = service.get_account_movements_with_link(account_id, link_token, limit=10, since=since_date)
-                        account['recent_movements'] = movements
-                        app.logger.info(f"Found {len(movements)} recent movements for account {account_id}")
-                
-                # Obtener resumen del link
-                summary = service.get_link_summary(link_token)
-                if not summary:
-                    # Calcular resumen básico si no está disponible
-                    summary = {
-                        "total_balance": sum(
-                            acc.get("balance", {}).get("current", 0) for acc in accounts
-                        ),
-                        "currency": (
-                            accounts[0].get("balance", {}).get("currency", "CLP")
-                            if accounts
-                            else "CLP"
-                        ),
-                        "accounts_count": len(accounts),
-                    }
+                    account_links[account.get("id")] = link_info.get("id")
 
+                # Resumen calculado con las cuentas ya obtenidas
+                summary = service.summarize_accounts(link_token, accounts)
                 financial_data.append(
                     {"link": link_info, "accounts": accounts, "summary": summary}
                 )
+                pending.append((link_token, accounts))
 
                 app.logger.info(
                     f"Loaded {len(accounts)} accounts for link {link_token}"
                 )
-            else:
-                app.logger.warning(f"No accounts found for link {link_token}")
-                # Intentar re-obtener el link para debugging
-                app.logger.info(f"Attempting to verify link {link_token} exists...")
-                try:
-                    verify_response = service.verify_link(link_token)
-                    app.logger.info(f"Link verification result: {verify_response}")
-                except Exception as e:
-                    app.logger.error(f"Error verifying link: {str(e)}")
+
+            # Las rutas de API usan este mapa para elegir el link de cada cuenta
+            session["fintoc_account_links"] = account_links
+
+            if pending:
+                # Movimientos de los últimos 30 días de todas las cuentas, en paralelo
+                movement_updates = service.iter_recent_movements(
+                    pending, limit=RECENT_MOVEMENTS_LIMIT, since=recent_movements_since()
+                )
+                if not stream:
+                    # Esperar todas las cuentas antes de renderizar
+                    for _ in movement_updates:
+                        pass
+                    movement_updates = None
+
+                # Se evalúa al renderizar, cuando ya llegaron todos los movimientos
+                timeline = service.merge_timelines(
+                    [account for _, accounts in pending for account in accounts],
+                    limit=20,
+                )
 
         except Exception as e:
             app.logger.error(f"Error loading financial data: {str(e)}")
@@ -300,7 +575,7 @@ def fintoc_dashboard():
                 "warning",
             )
     else:
-        app.logger.info("No fintoc_link_token found in session")
+        app.logger.info("No Fintoc links found in session")
 
         # DEBUG: Intentar obtener links directamente (si estuviéramos usando una DB)
         # En producción, aquí consultaríamos una base de datos de links por usuario
@@ -308,17 +583,27 @@ def fintoc_dashboard():
             "Session does not contain link token. User needs to connect bank account."
         )
 
-    return render_template(
-        "fintoc/dashboard.html",
-        title="Financial Dashboard",
-        configured=True,
-        links=links,
-        financial_data=financial_data,
-    )
+    context = {
+        "title": "Financial Dashboard",
+        "configured": True,
+        "links": links,
+        "financial_data": financial_data,
+        "movement_updates": movement_updates,
+        "timeline": timeline,
+    }
+
+    if movement_updates is None:
+        return render_template("fintoc/dashboard.html", **context)
+
+    # La sesión se guarda antes de transmitir el cuerpo, así que los mensajes
+    # flash deben consumirse ahora para que no reaparezcan
+    get_flashed_messages()
+    return stream_template("fintoc/dashboard.html", **context)
 
 
 @app.route("/fintoc/connect")
 @login_required
+@admitted("fintoc_page")
 def fintoc_connect():
     """Conectar cuenta bancaria usando Fintoc - Solo bancos chilenos"""
     try:
@@ -380,6 +665,7 @@ def fintoc_connect():
 
 @app.route("/fintoc/exchange", methods=["POST"])
 @login_required
+@admitted("fintoc_api")
 def fintoc_exchange():
     """Intercambiar exchange_token por link permanente"""
     try:
@@ -404,13 +690,35 @@ def fintoc_exchange():
 
         # Guardar link_token completo en la sesión
         link_token = link.get("link_token") or link.get("id")
-        
-        session["fintoc_link_token"] = link_token
-        session["fintoc_link_data"] = link
-        
+
+        # Agregar el link a los ya conectados (o reemplazar si es el mismo)
+        links = [
+            entry
+            for entry in get_session_links()
+            if entry["link"].get("id") != link.get("id")
+        ]
+        links.append({"link_token": link_token, "link": summarize_link(link)})
+        session["fintoc_links"] = links
+
         app.logger.info(f"Stored link_token: {link_token[:30]}..." if link_token else "No link_token")
         app.logger.info(f"Full link data: {link}")
 
+        # Precargar cuentas y movimientos para que el dashboard ya los tenga
+        prefetch_seconds = app.config["FINTOC_PREFETCH_SECONDS"]
+        if link_token and prefetch_seconds:
+            service.prefetch_link(
+                link_token,
+                limit=RECENT_MOVEMENTS_LIMIT,
+                since=recent_movements_since(),
+                keep_for=prefetch_seconds,
+            )
+
+        # Indexar el historial en segundo plano para la búsqueda
+        if link_token:
+            service.sync_link_in_background(
+                link_token, since=movement_sync_since(app.config["MOVEMENT_SYNC_DAYS"])
+            )
+
         app.logger.info(f"Link created successfully: {link.get('id')}")
 
         return jsonify(
@@ -468,8 +776,11 @@ def fintoc_callback():
 
 @app.route("/api/fintoc/accounts/<link_id>")
 @login_required
+@admitted("fintoc_api")
+@rate_limited
 def api_fintoc_accounts(link_id):
     """API endpoint to get accounts for a specific link"""
+    fintoc_service = get_fintoc_service()
     if not fintoc_service.is_configured():
         return jsonify({"error": "Fintoc service not configured"}), 500
 
@@ -479,8 +790,11 @@ def api_fintoc_accounts(link_id):
 
 @app.route("/api/fintoc/movements/<account_id>")
 @login_required
+@admitted("fintoc_api")
+@rate_limited
 def api_fintoc_movements(account_id):
     """API endpoint to get movements for a specific account"""
+    fintoc_service = get_fintoc_service()
     if not fintoc_service.is_configured():
         return jsonify({"error": "Fintoc service not configured"}), 500
 
@@ -489,10 +803,10 @@ def api_fintoc_movements(account_id):
     since = request.args.get("since")  # YYYY-MM-DD format
     until = request.args.get("until")  # YYYY-MM-DD format
 
-    # Get link_token from session
-    link_token = session.get("fintoc_link_token")
+    # Get the link_token that owns this account from session
+    link_token = link_token_for_account(account_id)
     if not link_token:
-        return jsonify({"error": "No link token found in session"}), 400
+        return jsonify({"error": "Account not found in the connected banks"}), 404
 
     app.logger.info(f"API: Getting movements for account {account_id} with link_token {link_token[:30]}...")
 
@@ -510,10 +824,188 @@ def api_fintoc_movements(account_id):
     )
 
 
+@app.route("/api/fintoc/movements/<account_id>/page")
+@login_required
+@admitted("fintoc_api")
+@rate_limited
+def api_fintoc_movements_page(account_id):
+    """Keyset-paginated movements of an account, newest first"""
+    fintoc_service = get_fintoc_service()
+    if not fintoc_service.is_configured():
+        return jsonify({"error": "Fintoc service not configured"}), 500
+
+    link_token = link_token_for_account(account_id)
+    if not link_token:
+        return jsonify({"error": "Account not found in the connected banks"}), 404
+
+    try:
+        movements, next_cursor = fintoc_service.get_movements_page(
+            account_id,
+            link_token,
+            cursor=request.args.get("cursor"),
+            limit=max(1, min(int(request.args.get("limit", MOVEMENTS_PAGE_SIZE)), 100)),
+            since=request.args.get("since"),
+            until=request.args.get("until"),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"status": "error", "error": str(e)}), 502
+
+    return jsonify(
+        {
+            "status": "success",
+            "movements": movements,
+            "count": len(movements),
+            "next_cursor": next_cursor,
+            "account_id": account_id,
+        }
+    )
+
+
+@app.route("/api/fintoc/movements/search")
+@login_required
+def api_fintoc_movements_search():
+    """Search synced movements by text, amount range and date"""
+    fintoc_service = get_fintoc_service()
+
+    link_tokens = [entry["link_token"] for entry in get_session_links()]
+    if not link_tokens:
+        return jsonify({"error": "No link token found in session"}), 400
+
+    try:
+        min_amount = request.args.get("min_amount", type=int)
+        max_amount = request.args.get("max_amount", type=int)
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+        movements, next_cursor = fintoc_service.store.search(
+            link_tokens,
+            text=request.args.get("q"),
+            account_id=request.args.get("account_id"),
+            min_amount=min_amount,
+            max_amount=max_amount,
+            since=request.args.get("since"),  # YYYY-MM-DD format
+            until=request.args.get("until"),  # YYYY-MM-DD format
+            cursor=request.args.get("cursor"),
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+
+    # Hasta qué día está completo el índice de cada cuenta
+    coverage = fintoc_service.store.coverage(
+        link_tokens, account_id=request.args.get("account_id")
+    )
+
+    return jsonify(
+        {
+            "status": "success",
+            "movements": movements,
+            "count": len(movements),
+            "next_cursor": next_cursor,
+            "coverage": coverage,
+        }
+    )
+
+
+@app.route("/api/fintoc/balances/history")
+@login_required
+def api_fintoc_balance_history():
+    """Downsampled balance history of the user's accounts"""
+    fintoc_service = get_fintoc_service()
+
+    link_tokens = [entry["link_token"] for entry in get_session_links()]
+    if not link_tokens:
+        return jsonify({"error": "No link token found in session"}), 400
+
+    period = request.args.get("period", "day")
+    try:
+        max_points = max(1, min(int(request.args.get("max_points", 400)), 1000))
+        series = fintoc_service.balances.history(
+            link_tokens,
+            period=period,
+            account_id=request.args.get("account_id"),
+            since=request.args.get("since"),  # YYYY-MM-DD format
+            until=request.args.get("until"),  # YYYY-MM-DD format
+            max_points=max_points,
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+
+    return jsonify({"status": "success", "period": period, "series": series})
+
+
+@app.route("/api/fintoc/export")
+@login_required
+@admitted("fintoc_export")
+@rate_limited
+def api_fintoc_export():
+    """Stream the full movement history of an account or a link as CSV or Parquet"""
+    fintoc_service = get_fintoc_service()
+    if not fintoc_service.is_configured():
+        return jsonify({"error": "Fintoc service not configured"}), 500
+
+    account_id = request.args.get("account_id")
+    link_id = request.args.get("link_id")
+    export_format = request.args.get("format", "csv")
+    since = request.args.get("since")  # YYYY-MM-DD format
+    until = request.args.get("until")  # YYYY-MM-DD format, day of the resume cursor
+    after_id = request.args.get("after_id")  # last movement id already received
+
+    if export_format not in ("csv", "parquet"):
+        return jsonify({"error": "format must be csv or parquet"}), 400
+    if export_format == "parquet" and not parquet_available():
+        return jsonify({"error": "Parquet export requires pyarrow"}), 501
+
+    if account_id:
+        link_token = link_token_for_account(account_id)
+        if not link_token:
+            return jsonify({"error": "Account not found in the connected banks"}), 404
+        movements = fintoc_service.iter_account_movements(
+            account_id, link_token, since=since, until=until
+        )
+    elif link_id:
+        link_token = next(
+            (
+                entry["link_token"]
+                for entry in get_session_links()
+                if entry["link"].get("id") == link_id
+            ),
+            None,
+        )
+        if not link_token:
+            return jsonify({"error": "Link not found"}), 404
+        movements = fintoc_service.iter_link_movements(
+            link_token, since=since, until=until
+        )
+    else:
+        return jsonify({"error": "account_id or link_id is required"}), 400
+
+    if after_id:
+        movements = resume_after(movements, after_id)
+
+    app.logger.info(f"Exporting movements for {account_id or link_id} as {export_format}")
+
+    if export_format == "parquet":
+        body, mimetype = iter_parquet(movements), "application/vnd.apache.parquet"
+    else:
+        body, mimetype = iter_csv(movements), "text/csv"
+
+    return app.response_class(
+        body,
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f"attachment; filename=movements-{account_id or link_id}.{export_format}"
+        },
+    )
+
+
 @app.route("/api/fintoc/refresh/<account_id>", methods=["POST"])
 @login_required
+@admitted("fintoc_api")
+@rate_limited
 def api_fintoc_refresh(account_id):
     """API endpoint to refresh account data"""
+    fintoc_service = get_fintoc_service()
     if not fintoc_service.is_configured():
         return jsonify({"error": "Fintoc service not configured"}), 500
 
@@ -532,15 +1024,31 @@ def api_fintoc_refresh(account_id):
 
 @app.route("/fintoc/account/<account_id>")
 @login_required
+@admitted("fintoc_page")
 def fintoc_account_detail(account_id):
     """Show detailed view of a specific account with movements"""
+    fintoc_service = get_fintoc_service()
     if not fintoc_service.is_configured():
         flash("Fintoc service is not configured.", "warning")
         return redirect(url_for("fintoc_dashboard"))
 
-    # Get recent movements (last 30 days)
-    since_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-    movements = fintoc_service.get_movements(account_id, limit=100, since=since_date)
+    link_token = link_token_for_account(account_id)
+    if not link_token and not get_session_links():
+        flash("Please connect a bank account first.", "info")
+        return redirect(url_for("fintoc_connect"))
+    if not link_token:
+        flash("Account not found in your connected banks.", "warning")
+        return redirect(url_for("fintoc_dashboard"))
+
+    # Only the first page is rendered; the rest is loaded with next_cursor
+    try:
+        movements, next_cursor = fintoc_service.get_movements_page(
+            account_id, link_token, limit=MOVEMENTS_PAGE_SIZE
+        )
+    except RuntimeError as e:
+        app.logger.error(f"Error loading movements for account {account_id}: {str(e)}")
+        flash("Could not load the movements of this account, please try again.", "error")
+        movements, next_cursor = [], None
 
     # Get account info from first movement or make separate API call
     # For simplicity, we'll pass the account_id and get details via AJAX
@@ -550,9 +1058,117 @@ def fintoc_account_detail(account_id):
         title="Account Details",
         account_id=account_id,
         movements=movements,
+        next_cursor=next_cursor,
+        page_size=MOVEMENTS_PAGE_SIZE,
     )
 
 
+@app.route("/metrics")
+@login_required
+def app_metrics():
+    """Counters and timings collected by this worker"""
+    return jsonify(metrics.snapshot())
+
+
+@app.route("/admin/profile-next", methods=["POST"])
+@login_required
+def admin_profile_next():
+    """Profile the next request made by this admin"""
+    if not app.config["PROFILER_ENABLED"]:
+        return jsonify({"status": "error", "message": "Profiler is disabled"}), 404
+    if current_user.email not in app.config["PROFILER_ADMIN_EMAILS"]:
+        return jsonify({"status": "error", "message": "Forbidden"}), 403
+
+    session["profile_next_request"] = True
+    return jsonify({"status": "success", "message": "Next request will be profiled"})
+
+
+@app.cli.command("compile-templates")
+def compile_templates():
+    """Precompile every template into the Jinja bytecode cache"""
+    names = app.jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        app.jinja_env.get_template(name)
+    click.echo(f"Compiled {len(names)} templates")
+
+
+@app.cli.command("startup-report")
+def startup_report():
+    """Show which imports dominate the time to load the app module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=app.root_path,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise click.ClickException(
+            result.stderr.splitlines()[-1] if result.stderr else "Import failed"
+        )
+
+    # Lines look like "import time:  self [us] | cumulative | <indent>module",
+    # children are printed before their parent and indented one level deeper
+    pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+    modules = []
+    total = 0
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3)) // 2
+        if depth == 1:
+            modules.append((int(match.group(2)), match.group(4)))
+        elif depth == 0 and match.group(4) == "app":
+            total = int(match.group(2))
+            break
+        elif depth == 0:
+            modules = []
+
+    click.echo(f"{'cumulative ms':>14}  module")
+    for cumulative, module in sorted(modules, reverse=True):
+        click.echo(f"{cumulative / 1000:>14.1f}  {module}")
+    click.echo(f"{total / 1000:>14.1f}  app (total)")
+
+
+@app.cli.command("sync-movements")
+@click.argument("link_tokens", nargs=-1, required=True)
+@click.option(
+    "--days",
+    type=int,
+    default=None,
+    help="Days of history to index (0 = full history)  [default: MOVEMENT_SYNC_DAYS]",
+)
+def sync_movements(link_tokens, days):
+    """Index the movement history of the given links for search"""
+    service = get_fintoc_service()
+    if not service.is_configured():
+        raise click.ClickException("FINTOC_API_KEY is not set")
+    if days is None:
+        days = app.config["MOVEMENT_SYNC_DAYS"]
+
+    failed = 0
+    for link_token in link_tokens:
+        synced = service.sync_link_movements(link_token, since=movement_sync_since(days))
+        failed += sum(1 for count in synced.values() if count is None)
+        click.echo(
+            f"{link_token[:12]}...: {sum(count or 0 for count in synced.values())} movements"
+            f" in {len(synced)} accounts"
+        )
+    if failed:
+        raise click.ClickException(f"{failed} accounts could not be synced, see the log")
+
+
+@app.cli.command("profile-token")
+@click.option("--minutes", default=10, show_default=True, help="Token lifetime")
+def profile_token(minutes):
+    """Print an X-Profile-Request header value for profiling requests"""
+    secret = app.config["PROFILER_SECRET"]
+    if not secret:
+        raise click.ClickException("PROFILER_SECRET is not set")
+    expires_at = int(datetime.now().timestamp()) + minutes * 60
+    click.echo(f"X-Profile-Request: {sign_profile_token(secret, expires_at)}")
+
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template("404.html", title="Page Not Found"), 404
@@ -0,0 +1,219 @@
+"""
+Balance Store
+Append-only per-account balance snapshots with daily, weekly and monthly
+rollups for history charts
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from movement_store import link_key
+from sqlite_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    link_key TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    balance INTEGER NOT NULL,
+    PRIMARY KEY (link_key, account_id, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    link_key TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    currency TEXT,
+    min INTEGER NOT NULL,
+    max INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,
+    PRIMARY KEY (link_key, account_id, period, bucket)
+) WITHOUT ROWID;
+"""
+
+PERIODS = ("day", "week", "month")
+
+# An unchanged balance is snapshotted again only after this long
+SNAPSHOT_MIN_INTERVAL = 3600
+
+
+def bucket_start(day: date, period: str) -> str:
+    """
+    Fecha de inicio del bucket que contiene ``day``
+
+    Raises:
+        ValueError: If ``period`` is not day, week or month
+    """
+    if period == "day":
+        return day.isoformat()
+    if period == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if period == "month":
+        return day.replace(day=1).isoformat()
+    raise ValueError(f"Invalid period: {period}")
+
+
+class BalanceStore:
+    def __init__(self, path: str):
+        """Open (or create) the SQLite time series at ``path``"""
+        self.path = path
+        self._pool = ConnectionPool(path)
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def record(self, link_token: str, accounts: List[Dict], ts: Optional[int] = None):
+        """
+        Guardar el balance actual de cada cuenta y actualizar sus rollups
+
+        A raw snapshot is appended only when the balance changed or the last
+        one is older than ``SNAPSHOT_MIN_INTERVAL``; the rollups are updated on
+        every sync, so a quiet day still gets its own bucket.
+
+        Args:
+            link_token: Token del link al que pertenecen las cuentas
+            accounts: Account objects as returned by the API
+            ts: Unix timestamp of the sync (defaults to now)
+        """
+        ts = int(ts if ts is not None else time.time())
+        day = datetime.fromtimestamp(ts, timezone.utc).date()
+        key = link_key(link_token)
+
+        recorded = 0
+        with self._pool.connection() as conn, conn:
+            for account in accounts:
+                balance = account.get("balance") or {}
+                if not account.get("id") or balance.get("current") is None:
+                    continue
+                current = balance["current"]
+                currency = balance.get("currency") or account.get("currency")
+
+                previous = conn.execute(
+                    """
+                    SELECT ts, balance FROM snapshots
+                    WHERE link_key = ? AND account_id = ?
+                    ORDER BY ts DESC LIMIT 1
+                    """,
+                    (key, account["id"]),
+                ).fetchone()
+                if (
+                    previous is None
+                    or previous["balance"] != current
+                    or ts - previous["ts"] >= SNAPSHOT_MIN_INTERVAL
+                ):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?)",
+                        (key, account["id"], ts, current),
+                    )
+                    recorded += 1
+
+                conn.executemany(
+                    """
+                    INSERT INTO rollups (link_key, account_id, period, bucket,
+                                         currency, min, max, last, last_ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (link_key, account_id, period, bucket) DO UPDATE SET
+                        currency = excluded.currency,
+                        min = MIN(min, excluded.min),
+                        max = MAX(max, excluded.max),
+                        last = CASE WHEN excluded.last_ts >= last_ts
+                                    THEN excluded.last ELSE last END,
+                        last_ts = MAX(last_ts, excluded.last_ts)
+                    """,
+                    [
+                        (key, account["id"], period, bucket_start(day, period),
+                         currency, current, current, current, ts)
+                        for period in PERIODS
+                    ],
+                )
+        logger.info(f"Recorded {recorded} balance snapshots for {len(accounts)} accounts")
+
+    def history(
+        self,
+        link_tokens: List[str],
+        period: str = "day",
+        account_id: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        max_points: int = 400,
+    ):
+        """
+        Series de balance por cuenta a partir de los rollups
+
+        Args:
+            link_tokens: Links the caller is allowed to see
+            period: Bucket size: day, week or month
+            account_id: Restrict to one account
+            since: Fecha de inicio (YYYY-MM-DD)
+            until: Fecha de fin (YYYY-MM-DD, inclusive)
+            max_points: Most recent buckets returned per account
+
+        Returns:
+            List of {"account_id", "currency", "points", "truncated"} dicts,
+            points oldest first as {"period_start", "min", "max", "last"}
+
+        Raises:
+            ValueError: If ``period``, ``since`` or ``until`` are malformed
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Invalid period: {period}")
+        if not link_tokens:
+            return []
+
+        keys = [link_key(token) for token in link_tokens]
+        clauses = [f"link_key IN ({', '.join('?' for _ in keys)})", "period = ?"]
+        params = keys + [period]
+        if account_id:
+            clauses.append("account_id = ?")
+            params.append(account_id)
+        if since:
+            # Incluir el bucket que contiene la fecha de inicio
+            clauses.append("bucket >= ?")
+            params.append(bucket_start(date.fromisoformat(since), period))
+        if until:
+            clauses.append("bucket <= ?")
+            params.append(date.fromisoformat(until).isoformat())
+
+        # Los max_points buckets más recientes de cada cuenta
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT account_id, bucket, currency, min, max, last, truncated FROM (
+                    SELECT account_id, bucket, currency, min, max, last,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY account_id ORDER BY bucket DESC
+                           ) AS position,
+                           COUNT(*) OVER (PARTITION BY account_id) > ? AS truncated
+                    FROM rollups
+                    WHERE {' AND '.join(clauses)}
+                )
+                WHERE position <= ?
+                ORDER BY account_id, bucket
+                """,
+                [max_points] + params + [max_points],
+            ).fetchall()
+
+        series = {}
+        for row in rows:
+            entry = series.setdefault(
+                row["account_id"],
+                {
+                    "account_id": row["account_id"],
+                    "currency": row["currency"],
+                    "points": [],
+                    "truncated": bool(row["truncated"]),
+                },
+            )
+            entry["currency"] = row["currency"]
+            entry["points"].append(
+                {
+                    "period_start": row["bucket"],
+                    "min": row["min"],
+                    "max": row["max"],
+                    "last": row["last"],
+                }
+            )
+        return list(series.values())
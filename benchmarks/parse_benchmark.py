@@ -0,0 +1,113 @@
+"""
+Parse Benchmark
+Compares response.json() with the projected streaming decoder on a synthetic
+Fintoc movements page
+
+Usage: python benchmarks/parse_benchmark.py --movements 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_stream  # noqa: E402
+from json_stream import MOVEMENT_PROJECTION, parse_projected  # noqa: E402
+
+
+def counterparty(i):
+    return {
+        "holder_id": f"1{i:07d}-{i % 10}",
+        "holder_name": f"Titular {i}",
+        "number": f"{i:012d}",
+        "institution": {"id": "cl_banco_de_chile", "name": "Banco de Chile", "country": "cl"},
+    }
+
+
+def movements_page(count):
+    """Cuerpo JSON de una página de movimientos con la forma de la API de Fintoc"""
+    page = [
+        {
+            "id": f"mov_{i:08d}",
+            "object": "movement",
+            "amount": (i % 97 - 48) * 1000,
+            "currency": "CLP",
+            "description": f"Transferencia {i} a comercio",
+            "post_date": "2026-10-01T00:00:00Z",
+            "transaction_date": "2026-09-30T18:22:11Z",
+            "type": "transfer",
+            "pending": False,
+            "reference_id": f"{i:010d}",
+            "comment": "Pago servicios " * 4,
+            "sender_account": counterparty(i),
+            "recipient_account": counterparty(i + 1),
+        }
+        for i in range(count)
+    ]
+    return json.dumps(page).encode("utf-8")
+
+
+class Body:
+    """Stand-in for a streamed ``requests`` response"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--movements", type=int, default=5000, help="Rows per page")
+    parser.add_argument("--runs", type=int, default=15, help="Timed runs per parser")
+    args = parser.parse_args()
+
+    body = movements_page(args.movements)
+    orjson = json_stream.orjson
+
+    def full():
+        # response.json() joins the whole body before decoding it
+        return json.loads(b"".join(Body(body).iter_content(64 * 1024)))
+
+    def projected_json():
+        json_stream.orjson = None
+        try:
+            return parse_projected(Body(body), MOVEMENT_PROJECTION)
+        finally:
+            json_stream.orjson = orjson
+
+    parsers = [("full", full), ("projected (json)", projected_json)]
+    if orjson is not None:
+        parsers.append(
+            ("projected (orjson)", lambda: parse_projected(Body(body), MOVEMENT_PROJECTION))
+        )
+
+    # Runs are interleaved so that machine noise affects every parser alike
+    timings = {name: [] for name, _ in parsers}
+    for _ in range(args.runs):
+        for name, parse in parsers:
+            started = time.perf_counter()
+            parse()
+            timings[name].append(time.perf_counter() - started)
+
+    print(f"{len(body) / 1024:.0f} KiB body, {args.movements} movements")
+    print(f"{'parser':>18}  {'median ms':>9}  {'peak KiB':>9}  {'kept KiB':>9}")
+    for name, parse in parsers:
+        # Memory is measured on a separate run, tracemalloc skews timings
+        tracemalloc.start()
+        result = parse()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        kept = len(json.dumps(result))
+        median = statistics.median(timings[name])
+        print(f"{name:>18}  {median * 1000:>9.1f}  {peak / 1024:>9.0f}  {kept / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,30 +4,105 @@ Handles all Fintoc API interactions for financial data aggregation
 """
 import requests
 from flask import current_app
+import heapq
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from contextvars import copy_context
+from datetime import date, timedelta
+from itertools import islice
 from typing import Dict, List, Optional
-import fintoc
+from balance_store import BalanceStore
+from json_stream import ACCOUNT_PROJECTION, MOVEMENT_PROJECTION, parse_projected
+from movement_store import MovementStore, decode_cursor, encode_cursor
+from single_flight import SingleFlight
+from tracing import KIND_CLIENT, current_span, span, traced
 
 logger = logging.getLogger(__name__)
 
+# Movimientos pedidos a Fintoc por cada página del detalle de cuenta
+MOVEMENTS_PAGE_FETCH = 200
+
+
+def _position(movement):
+    """Keyset position of a movement: (post_date, id)"""
+    return (movement.get('post_date') or '', movement.get('id') or '')
+
+
 class FintocService:
     def __init__(self):
         """Initialize Fintoc client with API credentials"""
         self.api_key = current_app.config.get('FINTOC_API_KEY')
         self.public_key = current_app.config.get('FINTOC_PUBLIC_KEY')
         self.base_url = "https://api.fintoc.com/v1"
+        self._client = None
+        
+        # Índice local de movimientos sincronizados
+        self.store = MovementStore(
+            current_app.config.get('MOVEMENT_DB_PATH')
+            or os.path.join(current_app.instance_path, 'movements.db')
+        )
+        
+        # Serie de tiempo de balances, un snapshot por cuenta en cada sync
+        self.balances = BalanceStore(
+            current_app.config.get('BALANCE_DB_PATH')
+            or os.path.join(current_app.instance_path, 'balances.db')
+        )
         
-        # Configurar la biblioteca oficial de Fintoc
-        if self.api_key:
-            self.client = fintoc.Fintoc(api_key=self.api_key)
-        else:
+        # Llamadas idénticas y concurrentes comparten una sola petición a Fintoc
+        self._account_flights = SingleFlight('accounts')
+        self._movement_flights = SingleFlight('movements')
+        self._link_flights = SingleFlight('link')
+        
+        # Pool compartido para llamadas a Fintoc que pueden hacerse en paralelo,
+        # dimensionado para los requests admitidos en cada worker
+        self._executor = ThreadPoolExecutor(
+            max_workers=current_app.config.get('FINTOC_POOL_SIZE') or 8,
+            thread_name_prefix="fintoc"
+        )
+        
+        # Sincronizaciones del índice, de a una para no ocupar el pool de requests
+        self._sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fintoc-sync")
+        
+        if not self.api_key:
             logger.warning("Fintoc API key not found. Set FINTOC_API_KEY environment variable.")
-            self.client = None
+    
+    @property
+    def client(self):
+        """Official Fintoc SDK client, imported and built on first use"""
+        if self._client is None and self.api_key:
+            import fintoc
+            self._client = fintoc.Fintoc(api_key=self.api_key)
+        return self._client
     
     def is_configured(self) -> bool:
         """Check if Fintoc is properly configured"""
         return self.api_key is not None
     
+    def _http(self, method, url, span_name, **kwargs):
+        """Petición HTTP a Fintoc, medida como span de cliente"""
+        with span(span_name, kind=KIND_CLIENT, **{'http.method': method}) as client_span:
+            send = requests.post if method == 'POST' else requests.get
+            response = send(url, **kwargs)
+            client_span.set_attribute('http.status_code', response.status_code)
+            return response
+    
+    @contextmanager
+    def _http_stream(self, url, span_name, **kwargs):
+        """
+        GET a Fintoc con stream=True cuyo span dura hasta leer el cuerpo
+        
+        The body is read inside the ``with`` block, so the client span covers
+        transfer and decoding too; the connection is released on exit.
+        """
+        with span(span_name, kind=KIND_CLIENT, **{'http.method': 'GET'}) as client_span:
+            response = requests.get(url, stream=True, **kwargs)
+            client_span.set_attribute('http.status_code', response.status_code)
+            with response:
+                yield response
+    
+    @traced()
     def create_link_intent(self, country: str = 'cl', user_id: str = None):
         """
         Crear un Link Intent para obtener widget_token
@@ -39,7 +114,7 @@ class FintocService:
         Returns:
             Link Intent object with widget_token
         """
-        if not self.client:
+        if not self.is_configured():
             logger.error("Fintoc client not configured")
             return None
             
@@ -70,8 +145,10 @@ class FintocService:
             if user_id:
                 data['user'] = {'id': user_id}
             
-            response = requests.post(
+            response = self._http(
+                'POST',
                 f"{self.base_url}/link_intents",
+                'POST /link_intents',
                 json=data,
                 headers=headers
             )
@@ -88,6 +165,7 @@ class FintocService:
             logger.error(f"Manual error creating link intent: {str(e)}")
             return None
     
+    @traced()
     def exchange_token_for_link(self, exchange_token):
         """
         Intercambiar exchange_token por link_token permanente
@@ -98,7 +176,7 @@ class FintocService:
         Returns:
             Link object with permanent link_token
         """
-        if not self.client:
+        if not self.is_configured():
             logger.error("Fintoc client not configured")
             return None
             
@@ -124,8 +202,10 @@ class FintocService:
             
             params = {'exchange_token': exchange_token}
             
-            response = requests.get(
+            response = self._http(
+                'GET',
                 f"{self.base_url}/links/exchange",
+                'GET /links/exchange',
                 params=params,
                 headers=headers
             )
@@ -159,17 +239,19 @@ class FintocService:
             logger.error(f"Manual exchange error: {str(e)}")
             return None
     
-    def get_link_accounts(self, link_token):
+    @traced()
+    def get_link_accounts(self, link_token, keep_for=0):
         """
         Obtener cuentas de un link usando el link_token
         
         Args:
             link_token: Token permanente del link
+            keep_for: Seconds the result stays shared with later callers
             
         Returns:
             List of account objects
         """
-        if not self.client:
+        if not self.is_configured():
             logger.error("Fintoc client not configured")
             return []
             
@@ -178,7 +260,13 @@ class FintocService:
             
             # Usar método manual por ahora
             logger.info(f"Using manual method for getting accounts")
-            return self._get_link_accounts_manual(link_token)
+            accounts = self._account_flights.do(
+                ('accounts', link_token),
+                lambda: self._get_link_accounts_manual(link_token),
+                keep_for=keep_for
+            )
+            # Cada llamador recibe sus propias copias para poder modificarlas
+            return [dict(account) for account in accounts]
                 
         except Exception as e:
             logger.error(f"Error getting accounts with library: {str(e)}")
@@ -197,22 +285,25 @@ class FintocService:
             
             # Intentar diferentes endpoints
             endpoints_to_try = [
-                f"{self.base_url}/accounts?link_token={link_token}",
-                f"{self.base_url}/links/{link_token}/accounts"
+                (f"{self.base_url}/accounts?link_token={link_token}", 'GET /accounts'),
+                (f"{self.base_url}/links/{link_token}/accounts", 'GET /links/{link_token}/accounts')
             ]
             
-            for endpoint in endpoints_to_try:
+            for attempt, (endpoint, span_name) in enumerate(endpoints_to_try):
                 logger.info(f"Trying endpoint: {endpoint}")
-                response = requests.get(endpoint, headers=headers, timeout=30)
-                
-                logger.info(f"Response status: {response.status_code}")
+                current_span().set_attribute('retries', attempt)
+                with self._http_stream(endpoint, span_name, headers=headers, timeout=30) as response:
+                    logger.info(f"Response status: {response.status_code}")
+                    
+                    if response.status_code == 200:
+                        result = parse_projected(response, ACCOUNT_PROJECTION)
+                    elif response.status_code != 404:
+                        logger.error(f"Unexpected error: {response.status_code} - {response.text}")
                 
                 if response.status_code == 200:
-                    result = response.json()
                     logger.info(f"Manual: Found {len(result)} accounts")
+                    self._record_balances(link_token, result)
                     return result
-                elif response.status_code != 404:
-                    logger.error(f"Unexpected error: {response.status_code} - {response.text}")
             
             logger.error("All manual endpoints failed")
             return []
@@ -221,6 +312,7 @@ class FintocService:
             logger.error(f"Manual accounts error: {str(e)}")
             return []
     
+    @traced()
     def get_account_movements(self, account_id, limit=50, since=None, until=None):
         """
         Obtener movimientos de una cuenta específica
@@ -234,7 +326,7 @@ class FintocService:
         Returns:
             List of movement objects
         """
-        if not self.client:
+        if not self.is_configured():
             logger.error("Fintoc client not configured")
             return []
             
@@ -266,20 +358,21 @@ class FintocService:
             
             logger.info(f"Manual: Requesting movements for account {account_id}")
             
-            response = requests.get(
+            with self._http_stream(
                 f"{self.base_url}/accounts/{account_id}/movements",
+                'GET /accounts/{account_id}/movements',
                 params=params,
                 headers=headers,
                 timeout=30
-            )
+            ) as response:
+                if response.status_code == 200:
+                    result = parse_projected(response, MOVEMENT_PROJECTION)
+                else:
+                    logger.error(f"Manual movements error: {response.status_code} - {response.text}")
+                    return []
             
-            if response.status_code == 200:
-                result = response.json()
-                logger.info(f"Manual: Found {len(result)} movements")
-                return result
-            else:
-                logger.error(f"Manual movements error: {response.status_code} - {response.text}")
-                return []
+            logger.info(f"Manual: Found {len(result)} movements")
+            return result
                 
         except Exception as e:
             logger.error(f"Manual movements error: {str(e)}")
@@ -291,7 +384,8 @@ class FintocService:
         """
         return self.get_account_movements(account_id, limit, since, until)
     
-    def get_account_movements_with_link(self, account_id, link_token, limit=50, since=None, until=None):
+    @traced()
+    def get_account_movements_with_link(self, account_id, link_token, limit=50, since=None, until=None, keep_for=0, page=None, strict=False):
         """
         Obtener movimientos de una cuenta específica usando link_token
         
@@ -301,14 +395,44 @@ class FintocService:
             limit: Número de movimientos a obtener (max 200)
             since: Fecha de inicio (YYYY-MM-DD)
             until: Fecha de fin (YYYY-MM-DD)
+            keep_for: Seconds the result stays shared with later callers
+            page: Página de resultados (1 = la más reciente), de ``limit`` movimientos
+            strict: Raise on upstream errors instead of returning an empty
+                list, for callers that page through the history
             
         Returns:
             List of movement objects
+        
+        Raises:
+            RuntimeError: If ``strict`` and Fintoc cannot be reached or
+                answers with an error
         """
         if not self.api_key:
             logger.error("Fintoc API key not configured")
+            if strict:
+                raise RuntimeError("Fintoc API key not configured")
             return []
-            
+        
+        # Una llamada en curso con un limit mayor también sirve a esta, salvo
+        # al pedir una página: su desplazamiento depende del limit
+        limit = min(limit, 200)
+        key = ('movements', link_token, account_id, since, until)
+        if page:
+            key += (page, limit)
+        if strict:
+            # Sin compartir con llamadas que convierten los errores en []
+            key += ('strict',)
+        movements = self._movement_flights.do(
+            key,
+            lambda: self._get_account_movements_with_link(account_id, link_token, limit, since, until, page, strict),
+            size=limit,
+            keep_for=keep_for
+        )
+        return [dict(movement) for movement in movements[:limit]]
+    
+    def _get_account_movements_with_link(self, account_id, link_token, limit, since, until, page=None, strict=False):
+        """Petición a Fintoc de get_account_movements_with_link"""
+        error = None
         try:
             headers = {
                 'Authorization': f'Bearer {self.api_key}',
@@ -316,52 +440,450 @@ class FintocService:
             }
             
             params = {
-                'limit': min(limit, 200),
+                'limit': limit,
                 'link_token': link_token
             }
             if since:
                 params['since'] = since
             if until:
                 params['until'] = until
+            if page:
+                params['page'] = page
             
             logger.info(f"Requesting movements for account {account_id} with link_token {link_token[:30]}...")
             
-            response = requests.get(
+            with self._http_stream(
                 f"{self.base_url}/accounts/{account_id}/movements",
+                'GET /accounts/{account_id}/movements',
                 params=params,
                 headers=headers,
                 timeout=30
-            )
-            
-            logger.info(f"Movements API Response Status: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                logger.info(f"Found {len(result)} movements for account {account_id}")
-                return result
-            elif response.status_code == 404:
-                logger.error(f"Account {account_id} not found")
-                return []
-            elif response.status_code == 401:
-                logger.error(f"Unauthorized access - check API key")
-                return []
-            elif response.status_code == 403:
-                logger.error(f"Forbidden access to account {account_id}")
-                return []
-            else:
-                logger.error(f"Error getting movements: {response.status_code} - {response.text}")
-                return []
+            ) as response:
+                logger.info(f"Movements API Response Status: {response.status_code}")
+                
+                if response.status_code == 200:
+                    result = parse_projected(response, MOVEMENT_PROJECTION)
+                elif response.status_code == 404:
+                    error = f"Account {account_id} not found"
+                elif response.status_code == 401:
+                    error = "Unauthorized access - check API key"
+                elif response.status_code == 403:
+                    error = f"Forbidden access to account {account_id}"
+                else:
+                    error = f"Error getting movements: {response.status_code} - {response.text}"
                 
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout getting movements for account {account_id}")
-            return []
+            error = f"Timeout getting movements for account {account_id}"
         except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error getting movements for account {account_id}")
-            return []
+            error = f"Connection error getting movements for account {account_id}"
         except Exception as e:
-            logger.error(f"Error getting movements: {str(e)}")
+            error = f"Error getting movements: {str(e)}"
+        
+        if error:
+            logger.error(error)
+            if strict:
+                raise RuntimeError(error)
             return []
+        
+        logger.info(f"Found {len(result)} movements for account {account_id}")
+        self._index_movements(link_token, account_id, result)
+        return result
     
+    def _record_balances(self, link_token, accounts):
+        """Guardar snapshots de balance sin afectar la respuesta"""
+        try:
+            self.balances.record(link_token, accounts)
+        except Exception as e:
+            logger.error(f"Error recording balances: {str(e)}")
+    
+    def _index_movements(self, link_token, account_id, movements):
+        """Guardar movimientos en el índice local sin afectar la respuesta"""
+        try:
+            self.store.save_movements(link_token, account_id, movements)
+        except Exception as e:
+            logger.error(f"Error indexing movements for account {account_id}: {str(e)}")
+    
+    def iter_account_movements(self, account_id, link_token, since=None, until=None, page_size=200):
+        """
+        Recorrer el historial completo de una cuenta, página por página
+        
+        Pages are requested newest first, moving ``until`` back to the oldest
+        day of the previous page; movements of that boundary day that were
+        already yielded are skipped, so only one page is held at a time. A day
+        with more than ``page_size`` movements is read with
+        ``iter_day_movements`` before moving on to the previous day.
+        
+        Args:
+            account_id: ID de la cuenta
+            link_token: Token del link para autenticación
+            since: Fecha de inicio (YYYY-MM-DD)
+            until: Fecha de fin (YYYY-MM-DD)
+            page_size: Movimientos por llamada (max 200)
+            
+        Yields:
+            Movement objects, newest first, each tagged with ``account_id``
+        
+        Raises:
+            RuntimeError: If Fintoc fails or a day cannot be read completely;
+                the caller must not treat what was yielded so far as the full
+                history
+        """
+        boundary_day = None
+        boundary_ids = set()
+        
+        while True:
+            page = self.get_account_movements_with_link(
+                account_id, link_token, limit=page_size, since=since, until=until, strict=True
+            )
+            fresh = [m for m in page if m.get('id') not in boundary_ids]
+            for movement in fresh:
+                movement.setdefault('account_id', account_id)
+                yield movement
+            
+            if len(page) < page_size:
+                return
+            
+            oldest_day = (page[-1].get('post_date') or '')[:10]
+            if not oldest_day:
+                return
+            
+            if not fresh:
+                # El día tiene más de page_size movimientos: recorrerlo por páginas
+                yield from self.iter_day_movements(
+                    account_id, link_token, oldest_day, page_size, skip_ids=boundary_ids
+                )
+                if since and oldest_day <= since:
+                    return
+                until = (date.fromisoformat(oldest_day) - timedelta(days=1)).isoformat()
+                boundary_day, boundary_ids = None, set()
+                continue
+            
+            if oldest_day != boundary_day:
+                boundary_day, boundary_ids = oldest_day, set()
+            boundary_ids.update(
+                m.get('id') for m in page if (m.get('post_date') or '')[:10] == oldest_day
+            )
+            until = oldest_day
+    
+    def iter_day_movements(self, account_id, link_token, day, page_size=200, skip_ids=()):
+        """
+        Recorrer todos los movimientos de un día con la paginación de Fintoc
+        
+        Args:
+            account_id: ID de la cuenta
+            link_token: Token del link para autenticación
+            day: Día a recorrer (YYYY-MM-DD)
+            page_size: Movimientos por llamada (max 200)
+            skip_ids: IDs already served, left out of the result
+            
+        Yields:
+            Movement objects of that day, each tagged with ``account_id``
+        
+        Raises:
+            RuntimeError: If Fintoc fails or a page after the first brings no
+                new movements, i.e. the pagination does not advance
+        """
+        seen = set(skip_ids)
+        page_number = 1
+        
+        while True:
+            page = self.get_account_movements_with_link(
+                account_id, link_token, limit=page_size, since=day, until=day, page=page_number,
+                strict=True
+            )
+            fresh = [m for m in page if m.get('id') not in seen]
+            for movement in fresh:
+                seen.add(movement.get('id'))
+                movement.setdefault('account_id', account_id)
+                yield movement
+            
+            if len(page) < page_size:
+                return
+            
+            if not fresh and page_number > 1:
+                logger.error(f"Page {page_number} of movements on {day} for account {account_id} repeats earlier pages")
+                raise RuntimeError(f"Could not read every movement on {day} for account {account_id}")
+            page_number += 1
+    
+    def iter_link_movements(self, link_token, since=None, until=None):
+        """
+        Recorrer el historial de todas las cuentas de un link
+        
+        Args:
+            link_token: Token permanente del link
+            since: Fecha de inicio (YYYY-MM-DD)
+            until: Fecha de fin (YYYY-MM-DD)
+            
+        Yields:
+            Movement objects of every account, merged newest first
+        
+        Raises:
+            RuntimeError: If the accounts or the history of one of them
+                cannot be read
+        """
+        accounts = self.get_link_accounts(link_token)
+        if not accounts:
+            # get_link_accounts devuelve [] cuando Fintoc falla
+            raise RuntimeError(f"Could not read the accounts of link {link_token[:30]}...")
+        histories = [
+            self.iter_account_movements(account['id'], link_token, since=since, until=until)
+            for account in accounts
+            if account.get('id')
+        ]
+        yield from heapq.merge(
+            *histories,
+            key=lambda movement: movement.get('post_date') or '',
+            reverse=True
+        )
+    
+    def sync_account_movements(self, account_id, link_token, since=None):
+        """
+        Indexar el historial de una cuenta para la búsqueda local
+        
+        Pages are indexed as ``iter_account_movements`` fetches them; only once
+        the walk reaches ``since`` is the account's coverage recorded, so a
+        failed sync never reports a partial index as complete. If the index
+        already covers ``since``, only the days from the previous sync on are
+        read again.
+        
+        Args:
+            account_id: ID de la cuenta
+            link_token: Token del link para autenticación
+            since: Oldest day to index (YYYY-MM-DD), None for the full history
+            
+        Returns:
+            Number of movements read from Fintoc
+        
+        Raises:
+            RuntimeError: If the history cannot be read completely
+        """
+        synced_through = date.today().isoformat()
+        fetch_since = since
+        previous = self.store.coverage([link_token], account_id)
+        if previous and (previous[0]['since'] is None or (since and previous[0]['since'] <= since)):
+            # Lo anterior a la última sincronización ya está indexado
+            since = previous[0]['since']
+            fetch_since = previous[0]['synced_through']
+        
+        count = sum(1 for _ in self.iter_account_movements(account_id, link_token, since=fetch_since))
+        self.store.mark_synced(link_token, account_id, synced_through, since)
+        logger.info(f"Synced {count} movements for account {account_id} since {fetch_since or 'the beginning'}")
+        return count
+    
+    def sync_link_movements(self, link_token, since=None):
+        """
+        Indexar el historial de todas las cuentas de un link
+        
+        Args:
+            link_token: Token permanente del link
+            since: Oldest day to index (YYYY-MM-DD), None for the full history
+            
+        Returns:
+            Dict of account_id to movements read, None for accounts whose sync
+            failed
+        """
+        synced = {}
+        for account in self.get_link_accounts(link_token):
+            if not account.get('id'):
+                continue
+            try:
+                synced[account['id']] = self.sync_account_movements(account['id'], link_token, since=since)
+            except Exception as e:
+                logger.error(f"Error syncing movements for account {account['id']}: {str(e)}")
+                synced[account['id']] = None
+        return synced
+    
+    def sync_link_in_background(self, link_token, since=None):
+        """
+        Programar sync_link_movements en el hilo de sincronización
+        
+        Returns:
+            Future resolving to the result of sync_link_movements
+        """
+        return self._sync_executor.submit(self.sync_link_movements, link_token, since=since)
+    
+    @traced()
+    def get_movements_page(self, account_id, link_token, cursor=None, limit=50, since=None, until=None):
+        """
+        Obtener una página de movimientos a partir de un cursor keyset
+        
+        Movements are fetched ``MOVEMENTS_PAGE_FETCH`` at a time, newest first,
+        starting at the cursor's day, so the cost does not grow with the scroll
+        depth. The oldest day of a full fetch may continue past it; when the
+        newer days do not fill the page, that day is read completely with
+        ``iter_day_movements`` before it is served. Rows are ordered by
+        (post_date, id), newest first; rows at or above the cursor were already
+        served and are dropped, so pages never overlap and no row is skipped.
+        
+        Args:
+            account_id: ID de la cuenta
+            link_token: Token del link para autenticación
+            cursor: ``next_cursor`` of the previous page, None for the first one
+            limit: Movimientos por página (1 a 100)
+            since: Fecha de inicio (YYYY-MM-DD)
+            until: Fecha de fin (YYYY-MM-DD)
+            
+        Returns:
+            Tuple of (movements, next_cursor or None)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+            RuntimeError: If Fintoc fails or a day with more than
+                ``MOVEMENTS_PAGE_FETCH`` movements cannot be read completely
+        """
+        limit = max(1, min(limit, 100))
+        after = decode_cursor(cursor) if cursor else None
+        fetch_until = after[0][:10] if after else until
+        rows = []
+        exhausted = False
+        
+        def unseen(movements):
+            movements = sorted(movements, key=_position, reverse=True)
+            return [m for m in movements if after is None or _position(m) < after]
+        
+        # Una fila más que limit indica si hay una página siguiente
+        while len(rows) <= limit and not exhausted:
+            page = self.get_account_movements_with_link(
+                account_id, link_token, limit=MOVEMENTS_PAGE_FETCH, since=since, until=fetch_until,
+                strict=True
+            )
+            exhausted = len(page) < MOVEMENTS_PAGE_FETCH
+            oldest_day = (page[-1].get('post_date') or '')[:10] if page else ''
+            if not exhausted and oldest_day:
+                # El día más antiguo de una página llena puede seguir en la
+                # próxima: solo se lee completo si los días más nuevos no bastan
+                rows.extend(unseen(m for m in page if (m.get('post_date') or '')[:10] != oldest_day))
+                if len(rows) > limit:
+                    break
+                page = list(self.iter_day_movements(
+                    account_id, link_token, oldest_day, MOVEMENTS_PAGE_FETCH
+                ))
+                fetch_until = (date.fromisoformat(oldest_day) - timedelta(days=1)).isoformat()
+                exhausted = bool(since) and oldest_day <= since
+            else:
+                exhausted = True
+            rows.extend(unseen(page))
+        
+        movements = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(*_position(movements[-1]))
+        return movements, next_cursor
+    
+    @traced()
+    def get_links_accounts(self, link_tokens):
+        """
+        Obtener cuentas de varios links en paralelo
+        
+        Args:
+            link_tokens: Tokens permanentes de los links
+            
+        Returns:
+            List with the accounts of each link, in the same order as link_tokens
+        """
+        # Cada tarea corre en el contexto del request para que sus spans se asocien a él
+        futures = [
+            self._executor.submit(copy_context().run, self.get_link_accounts, link_token)
+            for link_token in link_tokens
+        ]
+        return [future.result() for future in futures]
+    
+    def iter_recent_movements(self, links, limit=10, since=None):
+        """
+        Obtener movimientos de varias cuentas en paralelo
+        
+        Args:
+            links: Lista de (link_token, accounts) con las cuentas de cada link
+            limit: Número de movimientos por cuenta (max 200)
+            since: Fecha de inicio (YYYY-MM-DD)
+            
+        Yields:
+            Each account dict with ``recent_movements`` set, in completion order
+        """
+        futures = {
+            self._executor.submit(
+                copy_context().run,
+                self.get_account_movements_with_link,
+                account['id'],
+                link_token,
+                limit=limit,
+                since=since
+            ): account
+            for link_token, accounts in links
+            for account in accounts
+            if account.get('id')
+        }
+        
+        for future in as_completed(futures):
+            account = futures[future]
+            account['recent_movements'] = future.result()
+            logger.info(f"Found {len(account['recent_movements'])} recent movements for account {account['id']}")
+            yield account
+    
+    def prefetch_link(self, link_token, limit=10, since=None, keep_for=60):
+        """
+        Precargar en segundo plano las cuentas y movimientos recientes de un link
+        
+        Results stay shared for ``keep_for`` seconds, so a dashboard request
+        made while the prefetch runs joins it and one made shortly after is
+        served from it. Use the same ``limit`` and ``since`` as the dashboard.
+        
+        Args:
+            link_token: Token permanente del link
+            limit: Movimientos por cuenta
+            since: Fecha de inicio (YYYY-MM-DD)
+            keep_for: Seconds the prefetched results stay available
+            
+        Returns:
+            Future resolving to the futures of the movement requests
+        """
+        def prefetch():
+            accounts = self.get_link_accounts(link_token, keep_for=keep_for)
+            logger.info(f"Prefetching movements of {len(accounts)} accounts for link {link_token[:30]}...")
+            # Sin esperar los resultados, para no ocupar un worker del pool
+            return [
+                self._executor.submit(
+                    self.get_account_movements_with_link,
+                    account['id'],
+                    link_token,
+                    limit=limit,
+                    since=since,
+                    keep_for=keep_for
+                )
+                for account in accounts
+                if account.get('id')
+            ]
+        
+        # Sin copiar el contexto: el request ya habrá terminado y no se traza
+        return self._executor.submit(prefetch)
+    
+    @staticmethod
+    def merge_timelines(accounts, limit=20):
+        """
+        Unir los movimientos recientes de varias cuentas en una sola línea de tiempo
+        
+        Each account's ``recent_movements`` arrives newest first from Fintoc, so a
+        k-way merge yields the combined timeline lazily without re-sorting.
+        
+        Args:
+            accounts: Cuentas con ``recent_movements`` ya obtenidos
+            limit: Número máximo de movimientos
+            
+        Yields:
+            (movement, account) tuples, newest first
+        """
+        def timeline(account):
+            for movement in account.get('recent_movements') or []:
+                yield movement, account
+        
+        merged = heapq.merge(
+            *(timeline(account) for account in accounts),
+            key=lambda item: item[0].get('post_date') or '',
+            reverse=True
+        )
+        yield from islice(merged, limit)
+    
+    @traced()
     def get_link_summary(self, link_token):
         """
         Obtener resumen completo de un link con cuentas y balances
@@ -372,8 +894,19 @@ class FintocService:
         Returns:
             Dict with link summary including accounts and total balance
         """
-        accounts = self.get_link_accounts(link_token)
+        return self.summarize_accounts(link_token, self.get_link_accounts(link_token))
+    
+    def summarize_accounts(self, link_token, accounts):
+        """
+        Calcular el resumen de un link a partir de cuentas ya obtenidas
         
+        Args:
+            link_token: Token permanente del link
+            accounts: Lista de cuentas del link
+            
+        Returns:
+            Dict with link summary including accounts and total balance
+        """
         if not accounts:
             return {
                 'link_token': link_token,
@@ -401,6 +934,7 @@ class FintocService:
             'accounts': accounts
         }
     
+    @traced()
     def verify_link(self, link_token):
         """
         Verificar que un link existe y está activo
@@ -414,15 +948,24 @@ class FintocService:
         if not self.api_key:
             logger.error("Fintoc API key not configured")
             return None
-            
+        
+        return self._link_flights.do(
+            ('link', link_token),
+            lambda: self._verify_link(link_token)
+        )
+    
+    def _verify_link(self, link_token):
+        """Petición a Fintoc de verify_link"""
         try:
             headers = {
                 'Authorization': f'Bearer {self.api_key}',
                 'Content-Type': 'application/json'
             }
             
-            response = requests.get(
+            response = self._http(
+                'GET',
                 f"{self.base_url}/links/{link_token}",
+                'GET /links/{link_token}',
                 headers=headers,
                 timeout=30
             )
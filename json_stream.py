@@ -0,0 +1,192 @@
+"""
+Streaming JSON Decoding
+Decodes Fintoc list responses a batch of elements at a time and keeps only
+the fields the app uses for each resource
+"""
+import json
+from typing import Callable, Dict, Iterable, Iterator, List
+
+try:
+    # Optional: decodes several times faster than the json module
+    import orjson
+except ImportError:
+    orjson = None
+
+# Projections: field name -> None (keep the value) or a nested projection
+ACCOUNT_FIELDS = {
+    "id": None,
+    "name": None,
+    "official_name": None,
+    "number": None,
+    "holder_id": None,
+    "holder_name": None,
+    "type": None,
+    "currency": None,
+    "refreshed_at": None,
+    "balance": {"available": None, "current": None, "limit": None, "currency": None},
+}
+
+_COUNTERPARTY_FIELDS = {"holder_id": None, "holder_name": None, "number": None}
+
+MOVEMENT_FIELDS = {
+    "id": None,
+    "amount": None,
+    "currency": None,
+    "description": None,
+    "post_date": None,
+    "transaction_date": None,
+    "type": None,
+    "pending": None,
+    "reference_id": None,
+    "comment": None,
+    "sender_account": _COUNTERPARTY_FIELDS,
+    "recipient_account": _COUNTERPARTY_FIELDS,
+}
+
+_WHITESPACE = b" \t\n\r"
+
+
+def projection(fields: Dict) -> Callable:
+    """
+    Compilar una proyección en una función que la aplica
+
+    Args:
+        fields: Field name -> None (keep the value) or a nested projection
+
+    Returns:
+        Callable that removes every other field from its argument in place and
+        returns it; non-dict values are returned untouched. Only use it on
+        freshly decoded objects nobody else holds.
+    """
+    keep = frozenset(fields)
+    nested = tuple(
+        (name, projection(sub)) for name, sub in fields.items() if sub is not None
+    )
+
+    def project(value):
+        if not isinstance(value, dict):
+            return value
+        for name in value.keys() - keep:
+            del value[name]
+        for name, project_nested in nested:
+            if name in value:
+                project_nested(value[name])
+        return value
+
+    return project
+
+
+ACCOUNT_PROJECTION = projection(ACCOUNT_FIELDS)
+MOVEMENT_PROJECTION = projection(MOVEMENT_FIELDS)
+
+
+def _loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _skip(buffer: bytes, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _last_boundary(buffer: bytes) -> int:
+    """Position right after the last ``}`` followed by ``, {``, or -1"""
+    end = len(buffer)
+    while True:
+        end = buffer.rfind(b"}", 0, end)
+        if end == -1:
+            return -1
+        comma = _skip(buffer, end + 1)
+        if comma < len(buffer) and buffer[comma:comma + 1] == b",":
+            brace = _skip(buffer, comma + 1)
+            if brace < len(buffer) and buffer[brace:brace + 1] == b"{":
+                return end + 1
+
+
+def iter_json_batches(chunks: Iterable[bytes]) -> Iterator[List]:
+    """
+    Decodificar un arreglo JSON de objetos por lotes
+
+    After each chunk, everything up to the last ``}, {`` is decoded with a
+    single ``loads`` call (orjson when installed), so only about one chunk of
+    text and its objects are alive at a time. A ``}, {`` inside a string or a
+    nested array makes that call fail; the text is then kept until a later
+    boundary (or the end of the body) completes it, never split wrongly.
+
+    Args:
+        chunks: UTF-8 encoded pieces of the body, e.g. ``response.iter_content``
+
+    Yields:
+        Lists of consecutive elements of the top-level array
+
+    Raises:
+        ValueError: If the body is not a complete JSON array
+    """
+    buffer = b""
+    opened = False
+
+    for chunk in chunks:
+        buffer += chunk
+        if not opened:
+            start = _skip(buffer, 0)
+            if start == len(buffer):
+                continue
+            if buffer[start:start + 1] != b"[":
+                raise ValueError("Expected a JSON array")
+            buffer = buffer[start + 1:]
+            opened = True
+
+        cut = _last_boundary(buffer)
+        if cut == -1:
+            continue
+        try:
+            batch = _loads(b"[" + buffer[:cut] + b"]")
+        except ValueError:
+            # El corte cayó dentro de un string o de un arreglo anidado
+            continue
+        # Descartar la coma que separa el lote del resto
+        buffer = buffer[_skip(buffer, cut) + 1:]
+        yield batch
+
+    if not opened:
+        raise ValueError("Incomplete JSON array")
+    try:
+        yield _loads(b"[" + buffer)
+    except ValueError as e:
+        raise ValueError("Incomplete JSON array") from e
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """
+    Decodificar un arreglo JSON elemento por elemento
+
+    Args:
+        chunks: UTF-8 encoded pieces of the body, e.g. ``response.iter_content``
+
+    Yields:
+        Each element of the top-level array
+
+    Raises:
+        ValueError: If the body is not a complete JSON array
+    """
+    for batch in iter_json_batches(chunks):
+        yield from batch
+
+
+def parse_projected(response, project: Callable, chunk_size: int = 16 * 1024) -> List[Dict]:
+    """
+    Leer una respuesta de lista de Fintoc conservando solo los campos proyectados
+
+    Args:
+        response: ``requests`` response, ideally opened with ``stream=True``
+        project: Compiled projection applied to every element
+        chunk_size: Bytes read from the socket (and decoded) at a time
+
+    Returns:
+        List of projected objects
+    """
+    result = []
+    for batch in iter_json_batches(response.iter_content(chunk_size=chunk_size)):
+        result.extend(map(project, batch))
+    return result
@@ -0,0 +1,62 @@
+"""
+Application Metrics
+In-process counters and timings, exposed through the /metrics endpoint
+"""
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    def __init__(self):
+        """Initialize empty counter and timing registries"""
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._timings = {}
+
+    def increment(self, name: str, value: int = 1):
+        """Increase a counter by ``value``"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Store the latest value of ``name``"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration sample for ``name``"""
+        with self._lock:
+            timing = self._timings.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0}
+            )
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def snapshot(self) -> dict:
+        """
+        Obtener una copia de todas las métricas
+
+        Returns:
+            Dict with counters, gauges and timings (in milliseconds)
+        """
+        with self._lock:
+            timings = {
+                name: {
+                    "count": t["count"],
+                    "avg_ms": round(t["total"] / t["count"] * 1000, 3),
+                    "max_ms": round(t["max"] * 1000, 3),
+                    "total_ms": round(t["total"] * 1000, 3),
+                }
+                for name, t in self._timings.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": timings,
+            }
+
+
+# Registro compartido por toda la aplicación
+metrics = Metrics()
@@ -0,0 +1,174 @@
+"""
+Movement Export
+Streams movement history as CSV or Parquet without holding it in memory
+"""
+import csv
+import io
+import logging
+from typing import Dict, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = [
+    "id",
+    "account_id",
+    "post_date",
+    "transaction_date",
+    "description",
+    "amount",
+    "currency",
+    "type",
+    "pending",
+    "reference_id",
+]
+
+
+def _row(movement: Dict) -> Dict:
+    return {field: movement.get(field) for field in EXPORT_FIELDS}
+
+
+def resume_after(movements: Iterable[Dict], movement_id: str) -> Iterator[Dict]:
+    """
+    Retomar una exportación después del último movimiento recibido
+
+    The caller restarts the export with ``until`` set to the day of its last
+    row; rows of that first day up to and including ``movement_id`` are
+    dropped. If the id is not found on that day nothing is dropped.
+
+    Args:
+        movements: Movement dicts, newest first
+        movement_id: ID of the last movement the client already has
+
+    Yields:
+        The remaining movements
+    """
+    skipped = []
+    first_day = None
+    for movement in movements:
+        if skipped is not None:
+            day = (movement.get("post_date") or "")[:10]
+            if first_day is None:
+                first_day = day
+            if day == first_day:
+                if movement.get("id") == movement_id:
+                    skipped = None
+                else:
+                    skipped.append(movement)
+                continue
+            yield from skipped
+            skipped = None
+        yield movement
+
+    if skipped:
+        yield from skipped
+
+
+def iter_csv(movements: Iterable[Dict], batch_size: int = 500) -> Iterator[str]:
+    """
+    Convertir movimientos a CSV por bloques
+
+    Args:
+        movements: Movement dicts, consumed lazily
+        batch_size: Rows per yielded chunk
+
+    Yields:
+        CSV text chunks, starting with the header row
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+
+    pending = 0
+    for movement in movements:
+        writer.writerow(_row(movement))
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after each row group"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow dependency"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_parquet(movements: Iterable[Dict], row_group_size: int = 10000) -> Iterator[bytes]:
+    """
+    Convertir movimientos a Parquet, un row group a la vez
+
+    Args:
+        movements: Movement dicts, consumed lazily
+        row_group_size: Rows buffered before each row group is written
+
+    Yields:
+        Parquet file bytes, flushed after every row group
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.string()),
+            ("account_id", pa.string()),
+            ("post_date", pa.string()),
+            ("transaction_date", pa.string()),
+            ("description", pa.string()),
+            ("amount", pa.int64()),
+            ("currency", pa.string()),
+            ("type", pa.string()),
+            ("pending", pa.bool_()),
+            ("reference_id", pa.string()),
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write(rows):
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        return sink.drain()
+
+    rows = []
+    try:
+        for movement in movements:
+            rows.append(_row(movement))
+            if len(rows) >= row_group_size:
+                yield write(rows)
+                rows = []
+        if rows:
+            yield write(rows)
+    finally:
+        writer.close()
+    yield sink.drain()
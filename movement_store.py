@@ -0,0 +1,282 @@
+"""
+Movement Store
+Local SQLite index over synced Fintoc movements for fast search
+"""
+import base64
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlite_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movements (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    link_key TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    post_date TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    currency TEXT,
+    description TEXT,
+    counterparty TEXT,
+    data TEXT NOT NULL,
+    UNIQUE (link_key, id)
+);
+CREATE INDEX IF NOT EXISTS ix_movements_date
+    ON movements (link_key, post_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_movements_amount
+    ON movements (link_key, amount);
+CREATE VIRTUAL TABLE IF NOT EXISTS movements_fts USING fts5(
+    description, counterparty, content='movements', content_rowid='pk'
+);
+CREATE TRIGGER IF NOT EXISTS movements_ai AFTER INSERT ON movements BEGIN
+    INSERT INTO movements_fts (rowid, description, counterparty)
+    VALUES (new.pk, new.description, new.counterparty);
+END;
+CREATE TRIGGER IF NOT EXISTS movements_ad AFTER DELETE ON movements BEGIN
+    INSERT INTO movements_fts (movements_fts, rowid, description, counterparty)
+    VALUES ('delete', old.pk, old.description, old.counterparty);
+END;
+CREATE TRIGGER IF NOT EXISTS movements_au AFTER UPDATE ON movements BEGIN
+    INSERT INTO movements_fts (movements_fts, rowid, description, counterparty)
+    VALUES ('delete', old.pk, old.description, old.counterparty);
+    INSERT INTO movements_fts (rowid, description, counterparty)
+    VALUES (new.pk, new.description, new.counterparty);
+END;
+CREATE TABLE IF NOT EXISTS coverage (
+    link_key TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    since TEXT,
+    synced_through TEXT NOT NULL,
+    PRIMARY KEY (link_key, account_id)
+) WITHOUT ROWID;
+"""
+
+
+def link_key(link_token: str) -> str:
+    """Stable identifier for a link that does not store the token itself"""
+    return hashlib.sha256(link_token.encode("utf-8")).hexdigest()[:32]
+
+
+def encode_cursor(post_date: str, movement_id: str) -> str:
+    """Opaque keyset cursor for the position after (post_date, id)"""
+    raw = json.dumps([post_date, movement_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodificar un cursor generado por encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        post_date, movement_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return str(post_date), str(movement_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _counterparty(movement: Dict) -> str:
+    names = []
+    for side in ("sender_account", "recipient_account"):
+        account = movement.get(side) or {}
+        if account.get("holder_name"):
+            names.append(account["holder_name"])
+    return " ".join(names)
+
+
+def _match_expression(text: str) -> str:
+    """Turn free text into an FTS5 prefix query that never raises syntax errors"""
+    terms = [term.replace('"', "") for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+class MovementStore:
+    def __init__(self, path: str):
+        """Open (or create) the SQLite index at ``path``"""
+        self.path = path
+        self._pool = ConnectionPool(path)
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def save_movements(self, link_token: str, account_id: str, movements: List[Dict]):
+        """
+        Guardar o actualizar movimientos obtenidos de Fintoc
+
+        Args:
+            link_token: Token del link al que pertenece la cuenta
+            account_id: ID de la cuenta
+            movements: Movement objects as returned by the API
+        """
+        key = link_key(link_token)
+        rows = [
+            (
+                movement["id"],
+                key,
+                account_id,
+                movement.get("post_date") or "",
+                movement.get("amount") or 0,
+                movement.get("currency"),
+                movement.get("description") or "",
+                _counterparty(movement),
+                json.dumps(movement),
+            )
+            for movement in movements
+            if movement.get("id")
+        ]
+        if not rows:
+            return
+
+        with self._pool.connection() as conn, conn:
+            conn.executemany(
+                """
+                INSERT INTO movements (id, link_key, account_id, post_date, amount,
+                                       currency, description, counterparty, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (link_key, id) DO UPDATE SET
+                    post_date = excluded.post_date,
+                    amount = excluded.amount,
+                    currency = excluded.currency,
+                    description = excluded.description,
+                    counterparty = excluded.counterparty,
+                    data = excluded.data
+                WHERE data != excluded.data
+                """,
+                rows,
+            )
+        logger.info(f"Indexed {len(rows)} movements for account {account_id}")
+
+    def mark_synced(self, link_token: str, account_id: str, synced_through: str, since: Optional[str] = None):
+        """
+        Registrar que el índice de una cuenta está completo en un rango de fechas
+
+        Args:
+            link_token: Token del link al que pertenece la cuenta
+            account_id: ID de la cuenta
+            synced_through: Day the sync started (YYYY-MM-DD); movements posted
+                later may still be missing
+            since: Oldest day indexed (YYYY-MM-DD), None for the full history
+        """
+        with self._pool.connection() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)",
+                (link_key(link_token), account_id, since, synced_through),
+            )
+
+    def coverage(self, link_tokens: List[str], account_id: Optional[str] = None):
+        """
+        Rango de fechas completo en el índice para cada cuenta sincronizada
+
+        Accounts that were never fully synced are left out: the index only has
+        the movements that happened to be fetched for them.
+
+        Returns:
+            List of {"account_id", "since", "synced_through"} dicts
+        """
+        if not link_tokens:
+            return []
+
+        keys = [link_key(token) for token in link_tokens]
+        clauses = [f"link_key IN ({', '.join('?' for _ in keys)})"]
+        params = list(keys)
+        if account_id:
+            clauses.append("account_id = ?")
+            params.append(account_id)
+
+        query = f"""
+            SELECT account_id, since, synced_through FROM coverage
+            WHERE {' AND '.join(clauses)}
+            ORDER BY account_id
+        """
+        with self._pool.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def search(
+        self,
+        link_tokens: List[str],
+        text: Optional[str] = None,
+        account_id: Optional[str] = None,
+        min_amount: Optional[int] = None,
+        max_amount: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ):
+        """
+        Buscar movimientos indexados, del más reciente al más antiguo
+
+        Args:
+            link_tokens: Links the caller is allowed to see
+            text: Free text matched against description and counterparty
+            account_id: Restrict to one account
+            min_amount: Minimum amount (inclusive)
+            max_amount: Maximum amount (inclusive)
+            since: Fecha de inicio (YYYY-MM-DD)
+            until: Fecha de fin (YYYY-MM-DD, inclusive)
+            cursor: Cursor returned by a previous page
+            limit: Page size
+
+        Returns:
+            Tuple of (movements, next_cursor or None)
+
+        Raises:
+            ValueError: If ``until`` or ``cursor`` are malformed
+        """
+        if not link_tokens:
+            return [], None
+
+        keys = [link_key(token) for token in link_tokens]
+        clauses = [f"m.link_key IN ({', '.join('?' for _ in keys)})"]
+        params = list(keys)
+
+        if text and _match_expression(text):
+            clauses.append(
+                "m.pk IN (SELECT rowid FROM movements_fts WHERE movements_fts MATCH ?)"
+            )
+            params.append(_match_expression(text))
+        if account_id:
+            clauses.append("m.account_id = ?")
+            params.append(account_id)
+        if min_amount is not None:
+            clauses.append("m.amount >= ?")
+            params.append(min_amount)
+        if max_amount is not None:
+            clauses.append("m.amount <= ?")
+            params.append(max_amount)
+        if since:
+            clauses.append("m.post_date >= ?")
+            params.append(since)
+        if until:
+            # post_date es un timestamp ISO: incluir el día completo
+            next_day = date.fromisoformat(until) + timedelta(days=1)
+            clauses.append("m.post_date < ?")
+            params.append(next_day.isoformat())
+        if cursor:
+            clauses.append("(m.post_date, m.id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        query = f"""
+            SELECT m.id, m.post_date, m.data FROM movements m
+            WHERE {' AND '.join(clauses)}
+            ORDER BY m.post_date DESC, m.id DESC
+            LIMIT ?
+        """
+        params.append(limit + 1)
+        with self._pool.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["post_date"], rows[-1]["id"])
+
+        return [json.loads(row["data"]) for row in rows], next_cursor
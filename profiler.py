@@ -0,0 +1,307 @@
+"""
+Request Profiler
+On-demand sampling profiler for single requests plus a low-frequency
+continuous sampler, written as collapsed stacks (flamegraph.pl / speedscope
+format)
+"""
+import hashlib
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import g, request, session
+from flask_login import current_user
+
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Request"
+
+# The continuous sampler writes one file per worker this often and keeps the
+# most recent CONTINUOUS_KEEP_FILES across workers (a day for a single worker)
+CONTINUOUS_FLUSH_SECONDS = 300
+CONTINUOUS_KEEP_FILES = 288
+
+
+def sign_profile_token(secret: str, expires_at: int) -> str:
+    """
+    Firmar un token para perfilar requests hasta ``expires_at``
+
+    Args:
+        secret: Shared PROFILER_SECRET
+        expires_at: Unix timestamp after which the token is rejected
+
+    Returns:
+        Value for the ``X-Profile-Request`` header
+    """
+    signature = hmac.new(
+        secret.encode("utf-8"), str(expires_at).encode("utf-8"), hashlib.sha256
+    ).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+def verify_profile_token(secret: str, token: str) -> bool:
+    """Check the signature and expiry of an ``X-Profile-Request`` value"""
+    expires_at, _, _ = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(token, sign_profile_token(secret, int(expires_at)))
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id: int, interval: float = 0.005, max_seconds: float = 30):
+        """
+        Muestrear la pila de un thread desde un thread aparte
+
+        Args:
+            thread_id: ``threading.get_ident()`` of the thread to profile
+            interval: Seconds between samples
+            max_seconds: Stop sampling after this long even if not stopped
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profiler", daemon=True
+        )
+        try:
+            self._cpu_clock = time.pthread_getcpuclockid(thread_id)
+        except (AttributeError, OSError):
+            # Not available on this platform: only wall time is recorded
+            self._cpu_clock = None
+
+    def _cpu_time(self) -> float:
+        if self._cpu_clock is None:
+            return 0.0
+        try:
+            return time.clock_gettime(self._cpu_clock)
+        except OSError:
+            return 0.0
+
+    def _stack(self):
+        return _collapse(sys._current_frames().get(self.thread_id))
+
+    def _run(self):
+        started = last_wall = time.perf_counter()
+        last_cpu = self._cpu_time()
+        while not self._stop.wait(self.interval):
+            stack = self._stack()
+            now, cpu = time.perf_counter(), self._cpu_time()
+            if stack:
+                # Weights are microseconds spent since the previous sample
+                self.wall[stack] += int((now - last_wall) * 1e6)
+                if cpu > last_cpu:
+                    self.cpu[stack] += int((cpu - last_cpu) * 1e6)
+            last_wall, last_cpu = now, cpu
+            if now - started > self.max_seconds:
+                break
+        self.wall_seconds = last_wall - started
+        self.cpu_seconds = sum(self.cpu.values()) / 1e6
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, directory: str, basename: str):
+        """
+        Guardar los stacks colapsados de tiempo de pared y de CPU
+
+        Returns:
+            Paths of the written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for kind, samples in (("wall", self.wall), ("cpu", self.cpu)):
+            path = os.path.join(directory, f"{basename}.{kind}.folded")
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, weight in samples.most_common():
+                    f.write(f"{stack} {weight}\n")
+            paths.append(path)
+        return paths
+
+
+class ContinuousProfiler:
+    def __init__(self, directory: str, interval: float = 0.1):
+        """
+        Muestrear todos los threads del worker a baja frecuencia, siempre
+
+        Every ``CONTINUOUS_FLUSH_SECONDS`` the wall-time samples are written to
+        ``continuous-<unix time>-<pid>.wall.folded``, each stack rooted at its
+        thread's name (numbers dropped) so idle or pool threads can be
+        filtered out.
+
+        Args:
+            directory: Where the collapsed-stack files are written
+            interval: Seconds between samples
+        """
+        self.directory = directory
+        self.interval = interval
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start the sampling thread in this process, again after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run, name="profiler-continuous", daemon=True
+            ).start()
+
+    def _run(self):
+        samples = Counter()
+        weight = int(self.interval * 1e6)
+        flush_at = time.monotonic() + CONTINUOUS_FLUSH_SECONDS
+        while True:
+            time.sleep(self.interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = names.get(thread_id, "thread")
+                if name.startswith("profiler"):
+                    continue
+                root = re.sub(r"[-_]\d+", "", name)
+                samples[f"{root};{_collapse(frame)}"] += weight
+            if time.monotonic() >= flush_at:
+                self._flush(samples)
+                samples = Counter()
+                flush_at = time.monotonic() + CONTINUOUS_FLUSH_SECONDS
+
+    def _flush(self, samples: Counter):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(
+                self.directory, f"continuous-{int(time.time())}-{os.getpid()}.wall.folded"
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, weight in samples.most_common():
+                    f.write(f"{stack} {weight}\n")
+
+            files = sorted(
+                name for name in os.listdir(self.directory) if name.startswith("continuous-")
+            )
+            for name in files[:-CONTINUOUS_KEEP_FILES]:
+                os.remove(os.path.join(self.directory, name))
+        except OSError as e:
+            logger.error(f"Error writing continuous profile: {str(e)}")
+
+
+def _profile_reason(app):
+    """Why this request should be profiled, or None"""
+    secret = app.config.get("PROFILER_SECRET")
+    token = request.headers.get(PROFILE_HEADER)
+    if token and secret and verify_profile_token(secret, token):
+        return "header"
+    if app.config.get("PROFILER_ADMIN_EMAILS") and session.pop("profile_next_request", False):
+        return "admin"
+    sample_rate = app.config.get("PROFILER_SAMPLE_RATE", 0)
+    if sample_rate and random.random() < sample_rate:
+        return "sampled"
+    return None
+
+
+def _hash(secret: str, value: str) -> str:
+    return hmac.new(
+        secret.encode("utf-8"), value.encode("utf-8"), hashlib.sha256
+    ).hexdigest()[:12]
+
+
+def init_profiler(app):
+    """
+    Perfilar requests puntuales cuando el profiler está habilitado
+
+    A request is profiled when it carries a valid signed ``X-Profile-Request``
+    header, when an admin asked for it through ``/admin/profile-next``, or at
+    random with probability ``PROFILER_SAMPLE_RATE``. Independently, every
+    thread is sampled every ``PROFILER_CONTINUOUS_INTERVAL`` seconds (0 turns
+    it off). With ``PROFILER_ENABLED`` off no hook is registered at all.
+
+    Args:
+        app: Flask application
+    """
+    if not app.config.get("PROFILER_ENABLED"):
+        return
+
+    directory = app.config.get("PROFILER_DIR") or os.path.join(
+        app.instance_path, "profiles"
+    )
+    continuous = None
+    if app.config.get("PROFILER_CONTINUOUS_INTERVAL"):
+        continuous = ContinuousProfiler(
+            directory, app.config["PROFILER_CONTINUOUS_INTERVAL"]
+        )
+
+    @app.before_request
+    def start_profile():
+        if continuous is not None:
+            # Started by the first request so each forked worker runs its own
+            continuous.ensure_started()
+        if request.endpoint == "static":
+            return
+        reason = _profile_reason(app)
+        if reason is None:
+            return
+        g.profile_reason = reason
+        g.profiler = SamplingProfiler(
+            threading.get_ident(),
+            app.config.get("PROFILER_INTERVAL", 0.005),
+            app.config.get("PROFILER_MAX_SECONDS", 30),
+        ).start()
+
+    @app.teardown_request
+    def finish_profile(error=None):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return
+        profiler.stop()
+
+        # La URL puede llevar IDs de cuentas: el nombre solo lleva hashes, y el
+        # log asocia cada hash a la plantilla de la ruta
+        secret = app.config.get("SECRET_KEY") or ""
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        route = _hash(secret, f"{request.method} {rule}")
+        user_id = current_user.get_id() if current_user.is_authenticated else "anonymous"
+        user = _hash(secret, str(user_id))
+        basename = f"{int(time.time() * 1000)}-{route}-{user}-{g.profile_reason}"
+        try:
+            profiler.write(directory, basename)
+        except OSError as e:
+            logger.error(f"Error writing profile: {str(e)}")
+            return
+
+        current_span().set_attribute("profile", basename)
+        logger.info(
+            f"Profiled {request.method} {rule} ({g.profile_reason}): "
+            f"wall {profiler.wall_seconds * 1000:.1f} ms, "
+            f"cpu {profiler.cpu_seconds * 1000:.1f} ms -> {basename}"
+        )
@@ -0,0 +1,89 @@
+"""
+Rate Limiter
+Token buckets per user and endpoint, shared by all workers through SQLite
+"""
+import logging
+import math
+import time
+
+from sqlite_pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Buckets idle this long are full again and can be dropped
+IDLE_SECONDS = 3600
+
+
+class TokenBucketLimiter:
+    def __init__(self, path: str, rate_per_minute: float = 30, burst: int = 10):
+        """
+        Args:
+            path: SQLite file shared by every worker
+            rate_per_minute: Tokens added to each bucket per minute
+            burst: Bucket capacity (calls allowed back to back)
+
+        Raises:
+            ValueError: If ``rate_per_minute`` is not positive or ``burst`` is
+                below 1
+        """
+        if rate_per_minute <= 0:
+            raise ValueError(f"rate_per_minute must be positive, got {rate_per_minute}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst}")
+        self.path = path
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self._calls = 0
+        # isolation_level=None: transactions are managed explicitly below
+        self._pool = ConnectionPool(path, timeout=5, isolation_level=None)
+        with self._pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def acquire(self, key: str):
+        """
+        Tomar un token del bucket ``key``
+
+        Returns:
+            Tuple (allowed, retry_after_seconds)
+        """
+        now = time.time()
+        with self._pool.connection() as conn:
+            # BEGIN IMMEDIATE serializes the read-modify-write across workers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = self.burst
+                if row:
+                    tokens = min(self.burst, row[0] + (now - row[1]) * self.rate)
+
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._calls += 1
+                if self._calls % 1000 == 0:
+                    conn.execute(
+                        "DELETE FROM buckets WHERE updated_at < ?", (now - IDLE_SECONDS,)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if allowed:
+            return True, 0
+        return False, math.ceil((1 - tokens) / self.rate)
@@ -0,0 +1,112 @@
+"""
+Single Flight
+Lets concurrent callers asking for the same data share one upstream call
+"""
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import metrics
+from tracing import current_span
+
+
+class _Call:
+    def __init__(self, size):
+        self.size = size
+        self.future = Future()
+        # Set once a finished call is kept for later callers
+        self.expires_at = None
+
+    def usable(self, now):
+        return self.expires_at is None or self.expires_at > now
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Prefix for the coalescing metrics of this group
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._leaders = 0
+        self._shared = 0
+
+    def do(self, key, fn, size=None, keep_for=0):
+        """
+        Ejecutar ``fn`` una sola vez entre llamadas concurrentes con la misma clave
+
+        Args:
+            key: Hashable identity of the request
+            fn: Callable performing the upstream request
+            size: Amount of data requested (e.g. a limit). A caller joins an
+                in-flight call for the same key whose size is at least as
+                large; ``None`` means the call returns everything.
+            keep_for: Seconds a non-empty result stays available to later
+                callers once the call finishes (used for prefetching). Empty
+                results usually mean the upstream call failed and are not kept.
+
+        Returns:
+            The result of the shared call (callers trim it to their own size)
+        """
+        with self._lock:
+            now = time.monotonic()
+            call = next(
+                (
+                    call
+                    for call in self._calls.get(key, [])
+                    if call.usable(now)
+                    and (call.size is None or (size is not None and call.size >= size))
+                ),
+                None,
+            )
+            leader = call is None
+            if leader:
+                call = _Call(size)
+                self._calls.setdefault(key, []).append(call)
+            self._record(shared=not leader)
+
+        current_span().set_attribute("cache", "miss" if leader else "hit")
+
+        if not leader:
+            return call.future.result()
+
+        try:
+            call.future.set_result(fn())
+        except BaseException as e:
+            call.future.set_exception(e)
+        finally:
+            with self._lock:
+                if keep_for and call.future.exception() is None and call.future.result():
+                    call.expires_at = time.monotonic() + keep_for
+                    self._prune()
+                else:
+                    calls = self._calls.get(key, [])
+                    calls.remove(call)
+                    if not calls:
+                        self._calls.pop(key, None)
+        return call.future.result()
+
+    def _prune(self):
+        """Drop kept results that expired; caller holds the lock"""
+        now = time.monotonic()
+        for key in list(self._calls):
+            calls = [call for call in self._calls[key] if call.usable(now)]
+            if calls:
+                self._calls[key] = calls
+            else:
+                del self._calls[key]
+
+    def _record(self, shared: bool):
+        """Count leaders and followers; caller holds the lock"""
+        if shared:
+            self._shared += 1
+            metrics.increment(f"singleflight.{self.name}.shared")
+        else:
+            self._leaders += 1
+            metrics.increment(f"singleflight.{self.name}.leader")
+        metrics.set_gauge(
+            f"singleflight.{self.name}.coalescing_ratio",
+            round(self._shared / (self._leaders + self._shared), 4),
+        )
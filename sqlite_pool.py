@@ -0,0 +1,65 @@
+"""
+SQLite Pool
+Reusable SQLite connections shared by the threads of a worker
+"""
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    def __init__(self, path: str, timeout: float = 10, isolation_level: str = "", max_idle: int = 8):
+        """
+        Pool de conexiones SQLite en modo WAL para ``path``
+
+        Connections are handed to one thread at a time and kept for reuse, so
+        a server that starts a thread per request (``python app.py``) does not
+        open a connection and rerun the PRAGMAs on every request.
+
+        Args:
+            path: SQLite file; its directory is created if missing
+            timeout: Seconds to wait for a lock held by another connection
+            isolation_level: ``sqlite3`` isolation level (None = autocommit,
+                for callers that issue BEGIN/COMMIT themselves)
+            max_idle: Connections kept open between uses
+        """
+        self.path = path
+        self.timeout = timeout
+        self.isolation_level = isolation_level
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # journal_mode=WAL is stored in the file; WAL lets readers run during writes
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            isolation_level=self.isolation_level,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Prestar una conexión del pool mientras dura el bloque ``with``"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
@@ -0,0 +1,148 @@
+"""
+Template Caching
+Persistent Jinja bytecode cache, per-fragment HTML cache and render timings
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import before_render_template, g, has_app_context, template_rendered
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from metrics import metrics
+from tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+
+class FragmentCache:
+    def __init__(self, max_entries: int = 512):
+        """Thread-safe LRU store for rendered template fragments"""
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Adds ``{% cache part, ... %}...{% endcache %}`` to templates
+
+    The rendered body is stored under the given key parts. Include the user,
+    the resource id and a ``data_version`` stamp so stale data never matches.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache_support", [nodes.List(parts)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+
+        key = "|".join(str(part) for part in parts)
+        rv = cache.get(key)
+        if rv is not None:
+            metrics.increment("template.fragment_cache.hit")
+            current_span().increment("fragment_cache.hit")
+            return rv
+
+        metrics.increment("template.fragment_cache.miss")
+        current_span().increment("fragment_cache.miss")
+        rv = caller()
+        cache.set(key, rv)
+        return rv
+
+
+def data_version(value) -> str:
+    """
+    Calcular una huella corta de los datos que alimentan un fragmento
+
+    Args:
+        value: Any JSON-serializable structure (movements, account, ...)
+
+    Returns:
+        Hex digest that changes whenever the data changes
+    """
+    payload = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _on_before_render(sender, template, context, **extra):
+    # Start times live in g, keyed by the context dict both signals receive,
+    # so templates never see them and nested renders keep their own
+    if has_app_context():
+        g.setdefault("_render_started_at", {})[id(context)] = time.perf_counter()
+
+
+def _on_rendered(sender, template, context, **extra):
+    if not has_app_context():
+        return
+    started_at = g.get("_render_started_at", {}).pop(id(context), None)
+    if started_at is not None:
+        metrics.observe(
+            f"template.render.{template.name}", time.perf_counter() - started_at
+        )
+
+
+def init_template_cache(app):
+    """
+    Configurar caché de bytecode, caché de fragmentos y métricas de render
+
+    Args:
+        app: Flask application, before any template has been loaded
+    """
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR") or os.path.join(
+        app.instance_path, "jinja_cache"
+    )
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    except OSError as e:
+        logger.warning(f"Jinja bytecode cache disabled: {str(e)}")
+
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = FragmentCache(
+        app.config.get("FRAGMENT_CACHE_SIZE", 512)
+    )
+    app.jinja_env.globals["data_version"] = data_version
+
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
@@ -0,0 +1,277 @@
+"""
+Request Tracing
+Lightweight spans per route and per Fintoc call, exported as OTLP/JSON lines
+and summarized in a Server-Timing header
+"""
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent=None, kind: int = KIND_INTERNAL):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else ""
+        self.attributes = {}
+        self.status = STATUS_OK
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def increment(self, key: str, value: int = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def end(self, error: bool = False):
+        if self.end_ns is None:
+            if error:
+                self.status = STATUS_ERROR
+            self.end_ns = time.time_ns()
+            self.trace.spans.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Returned when no trace is active (CLI commands, untraced threads)"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def increment(self, key, value=1):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def current_span():
+    """The innermost active span, or a no-op span outside traced requests"""
+    return _current_span.get() or _NOOP
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """
+    Medir un bloque como span hijo del span actual
+
+    Args:
+        name: Span name
+        kind: OTLP span kind
+        **attributes: Initial span attributes
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+
+    child = Span(parent.trace, name, parent, kind)
+    child.attributes.update(attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException:
+        child.end(error=True)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name: str = None):
+    """Decorator wrapping a function call in a span"""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace, service_name: str) -> dict:
+    """Convertir un trace al formato OTLP/JSON (ExportTraceServiceRequest)"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": service_name}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [
+                            {
+                                "traceId": trace.trace_id,
+                                "spanId": s.span_id,
+                                "parentSpanId": s.parent_id,
+                                "name": s.name,
+                                "kind": s.kind,
+                                "startTimeUnixNano": str(s.start_ns),
+                                "endTimeUnixNano": str(s.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in s.attributes.items()
+                                ],
+                                "status": {"code": s.status},
+                            }
+                            for s in trace.spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def server_timing(trace: Trace, root: Span) -> str:
+    """Server-Timing header value listing the spans finished so far"""
+    entries = []
+    for index, s in enumerate(trace.spans):
+        metric = re.sub(r"[^A-Za-z0-9_.-]", "_", s.name)
+        entries.append(f'{index}-{metric};dur={s.duration_ms:.1f};desc="{s.name}"')
+    entries.append(f'total;dur={root.duration_ms:.1f};desc="{root.name}"')
+    return ", ".join(entries)
+
+
+class FileExporter:
+    def __init__(self, path: str, service_name: str, max_bytes: int = 10 * 1024 * 1024):
+        """
+        Append one OTLP/JSON document per trace to ``path``
+
+        Args:
+            path: File the traces are appended to
+            service_name: ``service.name`` resource attribute
+            max_bytes: Once the file would grow past this size it is moved to
+                ``<path>.1`` (replacing the previous one) and a new file is
+                started; 0 disables rotation
+        """
+        self.path = path
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _rotate(self, incoming: int):
+        """Rotar el archivo si ``incoming`` bytes más superan max_bytes"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size and size + incoming > self.max_bytes:
+            os.replace(self.path, f"{self.path}.1")
+
+    def export(self, trace: Trace):
+        line = json.dumps(to_otlp(trace, self.service_name)) + "\n"
+        try:
+            with self._lock:
+                if self.max_bytes:
+                    self._rotate(len(line))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.error(f"Error exporting trace: {str(e)}")
+
+
+def init_tracing(app):
+    """
+    Abrir un span raíz por request y exportarlo al terminar
+
+    Args:
+        app: Flask application
+    """
+    if not app.config.get("TRACING_ENABLED", True):
+        return
+
+    exporter = FileExporter(
+        app.config.get("TRACE_FILE") or os.path.join(app.instance_path, "traces.jsonl"),
+        app.config.get("TRACE_SERVICE_NAME", "personal-finance"),
+        app.config.get("TRACE_FILE_MAX_BYTES", 10 * 1024 * 1024),
+    )
+
+    @app.before_request
+    def start_trace():
+        if request.endpoint == "static":
+            return
+        rule = request.url_rule.rule if request.url_rule else request.path
+        root = Span(Trace(), f"{request.method} {rule}", kind=KIND_SERVER)
+        root.set_attribute("http.method", request.method)
+        root.set_attribute("http.route", rule)
+        root.set_attribute("flask.endpoint", request.endpoint or "")
+        g.trace_root = root
+        g.trace_token = _current_span.set(root)
+
+    @app.after_request
+    def add_server_timing(response):
+        root = g.get("trace_root")
+        if root is not None:
+            root.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                root.status = STATUS_ERROR
+            # Spans still running in a streamed body only reach the exported trace
+            response.headers["Server-Timing"] = server_timing(root.trace, root)
+        return response
+
+    @app.teardown_request
+    def finish_trace(error=None):
+        root = g.pop("trace_root", None)
+        if root is None:
+            return
+        root.end(error=error is not None)
+        try:
+            _current_span.reset(g.pop("trace_token"))
+        except ValueError:
+            # Streamed responses may finish in a different context
+            _current_span.set(None)
+        exporter.export(root.trace)